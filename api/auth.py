@@ -12,9 +12,10 @@ from services.database import (
     create_user,
     get_user_by_email,
     get_user_by_username,
-    verify_password,    # this is the one and only verify_password
+    authenticate_user,
     get_db_session,
 )
+from services.password_hasher import HasherBusyError
 from passlib.context import CryptContext
 
 SECRET_KEY = "your-secret-key"
@@ -52,7 +53,10 @@ async def signup(user: UserIn, db_session=Depends(get_db_session)):
         raise HTTPException(status_code=400, detail="Username already taken")
 
     # hash via the database module’s utilities
-    created = await create_user(db_session, user.email, user.username, user.password)
+    try:
+        created = await create_user(db_session, user.email, user.username, user.password)
+    except HasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
     return {"id": created.id, "email": created.email, "username": created.username}
 
 
@@ -61,12 +65,15 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db_session = Depends(get_db_session),
 ):
-    user = await get_user_by_email(db_session, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        user = await authenticate_user(db_session, form_data.username, form_data.password)
+    except HasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "2"})
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
     access_token = create_access_token(
-        data={"sub": user.email},
+        data={"sub": user.email, "uid": user.id},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Body, HTTPException, Depends
+import asyncio
+import json
+import threading
+from fastapi import APIRouter, Body, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 from services.auth_utils import get_current_user_id
-from services.database import get_db_session, Chat, Message, User
-from services.chatbot_service import generate_response
+from services.database import (
+    get_db_session, AsyncSessionLocal, Chat, Message, User, list_chats, get_chat_messages_page
+)
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.chatbot_service import generate_response, stream_response, TIMEOUT_MESSAGE
+from services.inference_executor import inference_executor, QueueFullError, DeadlineExceededError
 from datetime import datetime
-from schemas.chat import ChatSchema 
+from schemas.chat import ChatListResponse
 
 router = APIRouter()
 
@@ -17,6 +24,7 @@ class ChatRequest(BaseModel):
     mode: str  # "general" or "pdf"
     chat_id: int  
     chunk_filename: Optional[str] = None
+    chunk_filenames: Optional[List[str]] = None  # PDF mode across several documents
 
 class ChatResponse(BaseModel):
     response: str
@@ -25,25 +33,30 @@ class ChatHistoryResponse(BaseModel):
     chat_id: int
     chat_name: str
     messages: List[dict]
+    next_cursor: Optional[int] = None   # `before` for older messages, None at the start
+    newer_cursor: Optional[int] = None  # `after` for newer messages, None at the end
+    has_more: bool = False
 
 
-@router.get("/chats", response_model=List[ChatSchema])
+@router.get("/chats", response_model=ChatListResponse)
 async def get_chats(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db_session: AsyncSession = Depends(get_db_session),
     user_id: int = Depends(get_current_user_id)
 ):
+    """
+    One page of the user's chats, newest first, with message count and a
+    preview of the last message instead of the messages themselves. Pass
+    `next_cursor` back as `cursor` for the next page.
+    """
     try:
-        stmt = (
-            select(Chat)
-            .where(Chat.user_id == user_id)
-            .options(selectinload(Chat.messages))
-            .order_by(Chat.created_at.desc())
-        )
-        result = await db_session.execute(stmt)
-        chats = result.scalars().all()
-        return chats
+        chats, next_cursor = await list_chats(db_session, user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return {"chats": chats, "next_cursor": next_cursor}
 
 
 @router.post("/create_chats", status_code=201)
@@ -82,16 +95,41 @@ async def add_message(
 
 @router.get("/chats/{chat_id}/messages", response_model=ChatHistoryResponse)
 async def get_chat_history(
-    chat_id: int, db_session: AsyncSession = Depends(get_db_session)
+    chat_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    db_session: AsyncSession = Depends(get_db_session)
 ):
-    stmt = select(Chat).filter(Chat.id == chat_id).options(selectinload(Chat.messages))
-    result = await db_session.execute(stmt)
-    chat = result.scalar_one_or_none()
+    """
+    `limit` messages of a chat, oldest first: the latest ones, or those just
+    before/after the message id given as `before`/`after`. Pass `next_cursor`
+    back as `before` to page further into the history and `newer_cursor` as
+    `after` to page towards the present.
+    """
+    chat = await db_session.get(Chat, chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
-    
-    messages = [{"sender": msg.sender, "message": msg.message, "timestamp": msg.timestamp} for msg in chat.messages]
-    return {"chat_id": chat.id, "chat_name": chat.chat_name, "messages": messages}
+
+    try:
+        page, next_cursor, newer_cursor = await get_chat_messages_page(
+            db_session, chat_id, limit, before=before, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    messages = [
+        {"id": msg.id, "sender": msg.sender, "message": msg.message, "timestamp": msg.timestamp}
+        for msg in page
+    ]
+    return {
+        "chat_id": chat.id,
+        "chat_name": chat.chat_name,
+        "messages": messages,
+        "next_cursor": next_cursor,
+        "newer_cursor": newer_cursor,
+        "has_more": next_cursor is not None,
+    }
 
 @router.put("/chats/{chat_id}")
 async def rename_chat(
@@ -122,16 +160,29 @@ async def delete_chat(
     return {"detail": "Chat deleted successfully"}
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, db_session: AsyncSession = Depends(get_db_session)):
+async def chat_endpoint(
+    request: ChatRequest,
+    db_session: AsyncSession = Depends(get_db_session),
+    user_id: int = Depends(get_current_user_id)
+):
 
     print("📥 Received request:", request)
     try:
-        response_text = generate_response(
+        # Generation runs on the inference executor so the event loop stays free
+        response_text = await inference_executor.run(
+            generate_response,
             query=request.query,
             mode=request.mode,
-            chunk_filename=request.chunk_filename
+            chunk_filename=request.chunk_filename,
+            chunk_filenames=request.chunk_filenames,
+            user_id=user_id,
         )
-        
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except DeadlineExceededError:
+        raise HTTPException(status_code=503, detail=TIMEOUT_MESSAGE, headers={"Retry-After": "5"})
+
+    try:
         new_user_message = Message(
             chat_id=request.chat_id,
             sender="user",
@@ -153,4 +204,90 @@ async def chat_endpoint(request: ChatRequest, db_session: AsyncSession = Depends
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+
+_STREAM_END = object()
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, user_id: int = Depends(get_current_user_id)):
+    """
+    Server-Sent Events variant of /chat.
+
+    Emits `data: {"token": ...}` events as the model generates, then a final
+    `done` event carrying the full response. Both messages are stored once the
+    stream completes; if the client disconnects, generation is cancelled and
+    nothing is stored.
+    """
+    print("📥 Received stream request:", request)
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancel_event = threading.Event()
+
+    def produce(deadline=None, cancel_event=None):
+        for token in stream_response(
+            query=request.query,
+            mode=request.mode,
+            chunk_filename=request.chunk_filename,
+            chunk_filenames=request.chunk_filenames,
+            user_id=user_id,
+            deadline=deadline,
+            cancel_event=cancel_event,
+        ):
+            loop.call_soon_threadsafe(queue.put_nowait, token)
+
+    # Admit before the response starts so a full queue is still a plain 429
+    try:
+        future = inference_executor.submit(produce, cancel_event=cancel_event)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    # Tokens are queued with call_soon_threadsafe first, so this always lands last
+    future.add_done_callback(lambda _: queue.put_nowait(_STREAM_END))
+
+    async def event_source():
+        parts = []
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                parts.append(item)
+                yield _sse({"token": item})
+
+            error = future.exception()
+            if isinstance(error, DeadlineExceededError):
+                yield _sse({"detail": TIMEOUT_MESSAGE}, event="error")
+                return
+            if error is not None:
+                yield _sse({"detail": f"⚠️ Generation failed: {error}"}, event="error")
+                return
+
+            response_text = "".join(parts)
+            async with AsyncSessionLocal() as db_session:
+                db_session.add(Message(
+                    chat_id=request.chat_id,
+                    sender="user",
+                    message=request.query,
+                    timestamp=datetime.utcnow()
+                ))
+                db_session.add(Message(
+                    chat_id=request.chat_id,
+                    sender="bot",
+                    message=response_text,
+                    timestamp=datetime.utcnow()
+                ))
+                await db_session.commit()
+            yield _sse({"response": response_text}, event="done")
+        finally:
+            # Runs on completion and when Starlette cancels us on client disconnect
+            cancel_event.set()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
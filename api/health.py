@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from configs.settings import WARMUP_MODELS, RETRIEVER_BACKEND
+from services.lazy_models import model_status
+from services.retriever_cache import retriever_cache
+
+router = APIRouter(tags=["Health"])
+
+@router.get("/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Ready once every model listed in WARMUP_MODELS is resident. Reports
+    which models are loaded either way.
+    """
+    models = model_status()
+    pending = [name for name in WARMUP_MODELS if not models.get(name, {}).get("loaded")]
+    body = {
+        "ready": not pending,
+        "waiting_for": pending,
+        "models": models,
+        "retriever_backend": RETRIEVER_BACKEND,
+        "retrievers_loaded": retriever_cache.stats()["entries"],
+    }
+    return JSONResponse(status_code=200 if not pending else 503, content=body)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.auth_utils import get_current_user_id
+from services.database import get_db_session, IngestionJob
+from services.ingestion_jobs import job_to_dict
+
+router = APIRouter(tags=["Ingestion Jobs"])
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session),
+):
+    job = await db.get(IngestionJob, job_id)
+    if job is None or job.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
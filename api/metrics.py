@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+
+from services.retriever_cache import retriever_cache
+from services.answer_cache import answer_cache
+from services.ingestion_jobs import ingestion_queue
+from services.resource_governor import governor
+from services.inference_executor import inference_executor
+from services.chatbot_service import scheduler
+from services.user_index import user_indexes
+from services.query_encoder import query_encoder
+from services.principal_cache import principal_cache
+from services.password_hasher import password_hasher
+from services.database import engine
+from services.db_engine import pool_stats
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics")
+async def get_metrics():
+    return {
+        "retriever_cache": retriever_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "ingestion": ingestion_queue.stats(),
+        "resource_governor": governor.stats(),
+        "inference": inference_executor.stats(),
+        "scheduler": scheduler.stats(),
+        "user_indexes": user_indexes.stats(),
+        "query_encoder": query_encoder.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "database": pool_stats(engine),
+    }
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from services.database import get_db_session, UserFile
 from services.auth_utils import get_current_user_id
+from services.pdf_contents import release_user_file
+from services.chunk_store import chunk_filename as chunk_filename_for, chunk_stem
+from services.multi_retriever import multi_search
+from services.inference_executor import inference_executor, QueueFullError, DeadlineExceededError
+from services.chatbot_service import TIMEOUT_MESSAGE
+from services.user_index import user_indexes
 
 router = APIRouter()
 
@@ -29,3 +38,63 @@ async def get_user_pdfs(
             detail=f"Error fetching PDFs: {str(e)}"
         )
 
+
+
+@router.get("/pdfs/search")
+async def search_user_pdfs(
+    q: str = Query(..., min_length=1),
+    top_k: int = Query(5, ge=1, le=50),
+    file_ids: Optional[List[int]] = Query(None),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session)
+):
+    """Search across all of the user's PDFs (or the given ones) at once."""
+    stmt = select(UserFile).where(UserFile.user_id == user_id)
+    if file_ids:
+        stmt = stmt.where(UserFile.id.in_(file_ids))
+    result = await db.execute(stmt)
+    files = {Path(f.file_path).stem: f for f in result.scalars().all()}
+    if not files:
+        return {"results": []}
+
+    chunk_filenames = [chunk_filename_for(stem) for stem in files]
+    try:
+        # Query encoding shares the inference slots with chat
+        hits = await inference_executor.run(multi_search, chunk_filenames, q, top_k, user_id)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except DeadlineExceededError:
+        raise HTTPException(status_code=503, detail=TIMEOUT_MESSAGE, headers={"Retry-After": "5"})
+
+    results = []
+    for hit in hits:
+        f = files.get(chunk_stem(hit.chunk_filename))
+        if f is None:
+            continue
+        results.append({
+            "file_id": f.id,
+            "filename": f.filename,
+            "chunk_filename": hit.chunk_filename,
+            "doc_id": hit.doc_id,
+            "chunk": hit.chunk,
+            "score": hit.score,
+            "pages": list(hit.pages),
+        })
+    return {"results": results}
+
+
+@router.delete("/pdfs/{file_id}")
+async def delete_user_pdf(
+    file_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session)
+):
+    user_file = await db.get(UserFile, file_id)
+    if user_file is None or user_file.user_id != user_id:
+        raise HTTPException(status_code=404, detail="PDF not found")
+
+    # Stored files are shared between identical uploads; they are only
+    # removed once the last reference goes away.
+    await release_user_file(db, user_file)
+    user_indexes.schedule_rebuild(user_id)
+    return {"message": "PDF deleted"}
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from services.database import get_db_session, UserFile
 from pathlib import Path
 from services.auth_utils import get_current_user_id
+from services.chunk_store import chunk_filename as chunk_filename_for
 
 router = APIRouter(tags=["PDF Selection"])
 
@@ -24,6 +25,6 @@ async def select_pdf(
         raise HTTPException(404, "File not found")
 
     stem = Path(file.file_path).stem  # e.g. "sample"
-    chunk_filename = f"{stem}_text_chunks.pkl"
+    chunk_filename = chunk_filename_for(stem)
 
     return {"chunk_filename": chunk_filename}
\ No newline at end of file
@@ -1,62 +1,110 @@
 # api/upload_pdf.py
 
 import os
-import shutil
-import uuid
 
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from services.process_pdf import PDFProcessor
-from services.chatbot_service import stop_model, start_model
+from services.ingestion_jobs import ingestion_queue, QueueFullError, JOB_DONE
 from services.auth_utils import get_current_user_id
-from services.database import UserFile, get_db_session
+from services.database import get_db_session, PdfContent
+from services.pdf_contents import (
+    save_upload_hashed,
+    storage_name,
+    get_content_by_hash,
+    attach_user_file,
+    CONTENT_PENDING,
+    CONTENT_READY,
+    CONTENT_FAILED,
+)
 from configs.paths import UPLOADS_DIR
 
 router = APIRouter()
 
-@router.post("/upload_pdf/")
+@router.post("/upload_pdf/", status_code=202)
 async def upload_pdf(
     file: UploadFile = File(...),
     user_id: int = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db_session),
 ):
     """
-    Save, process, and index the uploaded PDF. This is a blocking endpoint.
-    """
-    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    Save the uploaded PDF and queue it for processing and indexing.
+    Returns a job id immediately; poll GET /jobs/{job_id} for progress.
 
-    # 1️⃣ Generate a unique filename to avoid collisions
-    unique_name = f"{uuid.uuid4().hex}_{file.filename}"
-    dest_path = os.path.join(UPLOADS_DIR, unique_name)
+    Uploads are content-addressed: a file that has been uploaded before (by
+    anyone) is not processed again, the user just gets a reference to it.
+    """
+    if ingestion_queue.pending >= ingestion_queue.max_pending:
+        raise HTTPException(status_code=503, detail="Too many PDFs are being processed, please retry shortly.")
 
-    # 2️⃣ Save file
+    # 1️⃣ Save to a temporary file, hashing as we stream
     try:
-        with open(dest_path, "wb") as buf:
-            shutil.copyfileobj(file.file, buf)
+        sha, tmp_path = await save_upload_hashed(file, UPLOADS_DIR)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save upload: {e}")
 
-    # 3️⃣ Stop the model, process the file, then restart the model
+    unique_name = storage_name(sha, file.filename)
+    content = await get_content_by_hash(db, sha)
+
+    # 2️⃣ Already indexed: nothing to process
+    if content is not None and content.status == CONTENT_READY:
+        os.remove(tmp_path)
+        await attach_user_file(db, content, user_id, unique_name)
+        await db.commit()
+        return JSONResponse(
+            status_code=200,
+            content={"message": "✅ PDF already processed.", "job_id": None, "status": JOB_DONE},
+        )
+
+    # 3️⃣ Being processed for someone else: ride along with that run
+    if content is not None and content.status == CONTENT_PENDING:
+        os.remove(tmp_path)
+        job = await ingestion_queue.create_job(
+            db, user_id, unique_name, content.file_path, content_id=content.id, schedule=False
+        )
+        return _queued(job)
+
+    # 4️⃣ New (or previously failed) content: store it and queue processing
+    dest_path = os.path.join(UPLOADS_DIR, unique_name)
+    os.replace(tmp_path, dest_path)
+    if content is None:
+        content = PdfContent(sha256=sha, file_path=dest_path, status=CONTENT_PENDING)
+        db.add(content)
+    else:
+        content.file_path = dest_path
+        content.status = CONTENT_PENDING
     try:
-        stop_model()
+        await db.commit()
+    except IntegrityError:
+        # A concurrent upload of the same file created the row first
+        await db.rollback()
+        content = await get_content_by_hash(db, sha)
+        if content.file_path != dest_path and os.path.exists(dest_path):
+            os.remove(dest_path)
+        job = await ingestion_queue.create_job(
+            db, user_id, unique_name, content.file_path, content_id=content.id, schedule=False
+        )
+        return _queued(job)
 
-        processor = PDFProcessor()
-        await processor.process_and_store(dest_path)
+    try:
+        job = await ingestion_queue.create_job(db, user_id, unique_name, dest_path, content_id=content.id)
+    except QueueFullError as e:
+        content.status = CONTENT_FAILED
+        await db.commit()
+        raise HTTPException(status_code=503, detail=str(e))
 
-        start_model()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+    return _queued(job)
 
-    # 4️⃣ Save metadata to DB
-    user_file = UserFile(
-        user_id=user_id,
-        filename=unique_name,
-        file_path=dest_path
-    )
-    db.add(user_file)
-    await db.commit()
 
-    # 5️⃣ Respond with success
-    return JSONResponse({"message": "✅ PDF uploaded and processed successfully."})
+def _queued(job):
+    # Respond with the job id so the client can poll for progress
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "📥 PDF uploaded and queued for processing.",
+            "job_id": job.id,
+            "status": job.status,
+        },
+    )
@@ -8,9 +8,11 @@ MODELS_DIR = os.path.join(BASE_DIR, 'models')
 SERVICES_DIR = os.path.join(BASE_DIR, 'services')
 UPLOADS_DIR = os.path.join(SERVICES_DIR, 'uploads')
 INDEXES_DIR = os.path.join(SERVICES_DIR, 'indexes')
+COLBERT_INDEXES_DIR = os.path.join(SERVICES_DIR, 'experiments', 'default', 'indexes')
 
 # Specific model paths
 MISTRAL_MODEL_PATH = os.path.join(MODELS_DIR, 'mistral', 'mistral-7b-instruct-v0.1.Q4_K_M.gguf')
+COLBERT_CHECKPOINT_PATH = os.path.join(MODELS_DIR, 'colbertv2.0')
 
 TEXT_STORAGE_PATH = os.path.join(SERVICES_DIR, 'text_chunks.pkl')
 
@@ -1,3 +1,6 @@
+import asyncio, logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse
@@ -10,11 +13,48 @@ from api.upload_pdf import router as upload_pdf_router
 from api.list_files import router as list_files_router
 from api.select_pdf import router as select_pdf_router
 from api.pdfs import router as pdfs_router
+from api.metrics import router as metrics_router
+from api.jobs import router as jobs_router
+from api.health import router as health_router
+from services.database import init_db
+from services.ingestion_jobs import ingestion_queue
+from services.ingestion_worker import shutdown_ingestion_pool
+from services.inference_executor import inference_executor
+from services.password_hasher import password_hasher
+from services.lazy_models import get_lazy_model
+from configs.settings import WARMUP_MODELS
 
 from api import list_files
 import os
 
-app = FastAPI()
+async def warm_up_models():
+    # Loads in the background so the server answers (and /health/ready
+    # reports progress) while the models come up
+    for name in WARMUP_MODELS:
+        model = get_lazy_model(name)
+        if model is None:
+            logging.warning(f"Unknown model in WARMUP_MODELS: {name}")
+            continue
+        try:
+            await asyncio.to_thread(model.get)
+        except Exception as e:
+            logging.error(f"Warm-up of {name} failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create missing tables, columns and indexes (a fresh SQLite file included)
+    await init_db()
+    # Pick up uploads that were still queued or running when the server stopped
+    await ingestion_queue.resume_pending()
+    warmup = asyncio.create_task(warm_up_models()) if WARMUP_MODELS else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    shutdown_ingestion_pool()
+    inference_executor.shutdown()
+    password_hasher.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -36,8 +76,8 @@ app.add_middleware(
 # Path to React build folder
 frontend_path = os.path.join(os.getcwd(), "web2pdf-frontend", "build")
 
-# Mount static files (CSS, JS, images, etc.)
-app.mount("/static", StaticFiles(directory=os.path.join(frontend_path, "static")), name="static")
+# Mount static files (CSS, JS, images, etc.); the API also runs without a frontend build
+app.mount("/static", StaticFiles(directory=os.path.join(frontend_path, "static"), check_dir=False), name="static")
 
 # API Routers
 app.include_router(auth_router)
@@ -46,6 +86,9 @@ app.include_router(upload_pdf_router)
 app.include_router(list_files_router)
 app.include_router(select_pdf_router)
 app.include_router(pdfs_router)
+app.include_router(metrics_router)
+app.include_router(jobs_router)
+app.include_router(health_router)
 
 # Serve index.html on any frontend route (React handles the routing)
 @app.get("/{full_path:path}")
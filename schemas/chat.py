@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class MessageSchema(BaseModel):
@@ -21,3 +21,20 @@ class ChatSchema(BaseModel):
 
     class Config:
         orm_mode = True
+
+class ChatSummarySchema(BaseModel):
+    id: int
+    user_id: int
+    chat_name: str
+    created_at: datetime
+    updated_at: datetime
+    message_count: int = 0
+    last_message: Optional[str] = None
+    last_message_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ChatListResponse(BaseModel):
+    chats: List[ChatSummarySchema]
+    next_cursor: Optional[str] = None
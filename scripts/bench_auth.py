@@ -0,0 +1,76 @@
+# scripts/bench_auth.py
+#
+# Per-request authentication overhead: JWT decode alone, the cached path
+# of get_current_user_id, and (unless --no-db) the uncached path that looks
+# the user up in the configured database, as every request used to.
+#
+#   python -m scripts.bench_auth [--requests 2000] [--email someone@example.com] [--no-db]
+
+import argparse, asyncio, statistics, time
+from datetime import timedelta
+
+from jose import jwt
+from sqlalchemy.future import select
+
+from api.auth import create_access_token
+from services.auth_utils import get_current_user_id, SECRET_KEY, ALGORITHM
+from services.database import AsyncSessionLocal, User, get_user_by_email
+from services.principal_cache import principal_cache
+
+
+async def measure(fn, n):
+    latencies = []
+    for _ in range(n):
+        started = time.perf_counter()
+        await fn()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies), latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--email", help="existing user to authenticate as (default: first user)")
+    parser.add_argument("--no-db", action="store_true", help="skip the uncached path")
+    args = parser.parse_args()
+
+    if args.no_db:
+        email, user_id = args.email or "bench@example.com", 1
+    else:
+        async with AsyncSessionLocal() as db:
+            user = await get_user_by_email(db, args.email) if args.email else None
+            if user is None:
+                user = (await db.execute(select(User).limit(1))).scalar_one_or_none()
+        if user is None:
+            raise SystemExit("No users in the database; sign up first or pass --no-db")
+        email, user_id = user.email, user.id
+
+    token = create_access_token({"sub": email, "uid": user_id}, timedelta(minutes=5))
+
+    async def decode_only():
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    async def cached():
+        await get_current_user_id(token, db_session=None)
+
+    async def uncached():
+        principal_cache.clear()
+        async with AsyncSessionLocal() as db:
+            await get_current_user_id(token, db_session=db)
+
+    principal_cache.put(email, user_id)
+    cases = [("jwt decode only", decode_only), ("cached principal", cached)]
+    if not args.no_db:
+        cases.append(("database lookup", uncached))
+
+    print(f"{'path':<20} {'p50 us':>10} {'p95 us':>10}")
+    for name, fn in cases:
+        principal_cache.put(email, user_id)
+        p50, p95 = await measure(fn, args.requests)
+        print(f"{name:<20} {p50 * 1e6:>10.1f} {p95 * 1e6:>10.1f}")
+    print(principal_cache.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
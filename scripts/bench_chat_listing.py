@@ -0,0 +1,122 @@
+# scripts/bench_chat_listing.py
+#
+# Measures the sidebar chat listing for a heavy user: the keyset-paginated
+# summary query (`list_chats`) against the old eager load of every chat with
+# every message. `--seed` first creates a benchmark user with N chats of M
+# messages each (10k x 100 by default) in the configured database.
+#
+#   python -m scripts.bench_chat_listing --seed [--chats 10000] [--messages 100]
+#   python -m scripts.bench_chat_listing [--runs 20] [--limit 50]
+
+import argparse, asyncio, statistics, time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from services.database import (
+    AsyncSessionLocal, init_db, get_user_by_email, create_user, Chat, Message, list_chats
+)
+
+BENCH_EMAIL = "bench-chats@example.com"
+INSERT_BATCH = 10_000
+
+
+async def seed(n_chats, n_messages):
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, BENCH_EMAIL)
+        if user is not None:
+            raise SystemExit(f"{BENCH_EMAIL} already exists; drop it to reseed")
+        user = await create_user(db, BENCH_EMAIL, "bench", "bench")
+
+        started = datetime.utcnow() - timedelta(days=365)
+        for first in range(0, n_chats, 1000):
+            chats = [
+                {"user_id": user.id, "chat_name": f"Chat {i}", "created_at": started + timedelta(minutes=i),
+                 "updated_at": started + timedelta(minutes=i)}
+                for i in range(first, min(n_chats, first + 1000))
+            ]
+            chat_ids = (await db.execute(insert(Chat).returning(Chat.id, Chat.created_at), chats)).all()
+            rows = []
+            for chat_id, created_at in chat_ids:
+                for j in range(n_messages):
+                    rows.append({
+                        "chat_id": chat_id,
+                        "sender": "user" if j % 2 == 0 else "bot",
+                        "message": f"Message {j} of chat {chat_id}. " * 8,
+                        "timestamp": created_at + timedelta(seconds=j),
+                    })
+                    if len(rows) >= INSERT_BATCH:
+                        await db.execute(insert(Message), rows)
+                        rows = []
+            if rows:
+                await db.execute(insert(Message), rows)
+            await db.commit()
+            print(f"seeded {first + len(chats)}/{n_chats} chats")
+
+
+async def eager_listing(db, user_id, limit):
+    result = await db.execute(
+        select(Chat).where(Chat.user_id == user_id)
+        .options(selectinload(Chat.messages))
+        .order_by(Chat.created_at.desc())
+    )
+    return result.scalars().all()
+
+
+async def paged_listing(db, user_id, limit):
+    rows, _ = await list_chats(db, user_id, limit)
+    return rows
+
+
+async def deep_page_listing(db, user_id, limit):
+    # Follows cursors ten pages in; keyset pages should cost the same
+    cursor = None
+    for _ in range(10):
+        rows, cursor = await list_chats(db, user_id, limit, cursor)
+    return rows
+
+
+async def measure(fn, user_id, runs, limit):
+    latencies = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await fn(db, user_id, limit)
+            latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return statistics.median(latencies), latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--chats", type=int, default=10_000)
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--eager-runs", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    await init_db()
+    if args.seed:
+        await seed(args.chats, args.messages)
+
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, BENCH_EMAIL)
+    if user is None:
+        raise SystemExit("No benchmark data; run with --seed first")
+
+    print(f"{'listing':<28} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, fn, runs in (
+        ("paginated summaries", paged_listing, args.runs),
+        ("paginated, page 10", deep_page_listing, max(1, args.runs // 10)),
+        ("eager chats+messages", eager_listing, args.eager_runs),
+    ):
+        p50, p95 = await measure(fn, user.id, runs, args.limit)
+        print(f"{name:<28} {p50 * 1000:>10.1f} {p95 * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# scripts/bench_retrieval.py
+#
+# Compares full ColBERT (PLAID) search with the hybrid mode (BM25 top-N
+# reranked by ColBERT) on the documents already uploaded. Queries are word
+# spans sampled from each document's chunks; recall@k is measured against
+# the full ColBERT results, and "source@k" is how often the chunk a query was
+# sampled from is retrieved.
+#
+#   python -m scripts.bench_retrieval [--queries 20] [--k 5] [--candidates 100 200]
+
+import argparse, glob, os, random, statistics, time
+
+from configs.paths import UPLOADS_DIR, COLBERT_INDEXES_DIR
+from services.chunk_store import chunk_stem, chunk_filename
+from services.colbert_retriever import ColBERTRetriever
+from services.lexical_index import lexical_index_path
+
+
+def sample_queries(store, n, rng, words=8):
+    queries = []
+    for pid in rng.sample(range(len(store)), min(n, len(store))):
+        tokens = store[pid].split()
+        if len(tokens) < words:
+            continue
+        start = rng.randrange(len(tokens) - words + 1)
+        queries.append((pid, " ".join(tokens[start:start + words])))
+    return queries
+
+
+def run(retriever, queries, k):
+    latencies, results = [], []
+    for _, query in queries:
+        retriever.encode(query)  # keep query encoding out of the comparison
+        started = time.perf_counter()
+        results.append([doc_id for doc_id, _ in retriever.search_with_ids(query, top_k=k)])
+        latencies.append(time.perf_counter() - started)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[100])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    stems = sorted({
+        chunk_stem(path) for path in glob.glob(os.path.join(UPLOADS_DIR, "*_text_chunks.bin"))
+        if os.path.exists(lexical_index_path(chunk_stem(path)))
+        and os.path.isdir(os.path.join(COLBERT_INDEXES_DIR, f"{chunk_stem(path)}_index"))
+    })
+    if not stems:
+        raise SystemExit(f"No documents with both a ColBERT and a BM25 index in {UPLOADS_DIR}")
+
+    print(f"{'document':<40} {'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9} {'source@k':>9}")
+    for stem in stems:
+        full = ColBERTRetriever(chunk_filename(stem), mode="colbert")
+        queries = sample_queries(full.text_chunks, args.queries, rng)
+        if not queries:
+            continue
+        base_lat, base_res = run(full, queries, args.k)
+        rows = [("colbert", base_lat, base_res)]
+        for n in args.candidates:
+            hybrid = ColBERTRetriever(chunk_filename(stem), mode="hybrid", candidates=n)
+            lat, res = run(hybrid, queries, args.k)
+            rows.append((f"hybrid@{n}", lat, res))
+
+        for mode, lat, res in rows:
+            recall = statistics.mean(
+                len(set(r) & set(b)) / max(1, len(b)) for r, b in zip(res, base_res)
+            )
+            source = statistics.mean(pid in r for (pid, _), r in zip(queries, res))
+            ordered = sorted(lat)
+            p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+            print(f"{stem[:40]:<40} {mode:<12} {statistics.median(lat) * 1000:>8.1f} "
+                  f"{p95 * 1000:>8.1f} {recall:>9.2f} {source:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# scripts/bench_summarization.py
+#
+# Compares TextSummarizer latency for 1, 3 and 10 context chunks with the old
+# one-chunk-at-a-time behaviour (batch_size=1) against batched summarization.
+#
+#   python -m scripts.bench_summarization [--batch-size 4] [--repeats 3]
+
+import argparse, glob, os, statistics, time
+
+from configs.paths import UPLOADS_DIR
+from services.summarization import TextSummarizer
+from services.chunk_store import open_chunk_store, chunk_stem
+
+
+def load_sample_text():
+    """Real text from an uploaded document, so timings reflect actual chunks."""
+    for path in sorted(glob.glob(os.path.join(UPLOADS_DIR, "*_text_chunks.*"))):
+        chunks = open_chunk_store(chunk_stem(path), UPLOADS_DIR)
+        if len(chunks):
+            return " ".join(chunks)
+    raise SystemExit(f"No chunk files found in {UPLOADS_DIR}")
+
+
+def time_summaries(summarizer, chunks, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        summarizer._summarize_chunks(chunks)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    summarizer = TextSummarizer(batch_size=1)
+    all_chunks = summarizer._chunk_text_by_tokens(load_sample_text())
+
+    print(f"{'chunks':>6} {'sequential (s)':>15} {'batched (s)':>12} {'speedup':>8}")
+    for n in (1, 3, 10):
+        chunks = all_chunks[:n]
+        if len(chunks) < n:
+            print(f"{n:>6} (document only has {len(chunks)} chunks, skipped)")
+            continue
+        summarizer.batch_size = 1
+        sequential = time_summaries(summarizer, chunks, args.repeats)
+        summarizer.batch_size = args.batch_size
+        batched = time_summaries(summarizer, chunks, args.repeats)
+        print(f"{n:>6} {sequential:>15.2f} {batched:>12.2f} {sequential / batched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
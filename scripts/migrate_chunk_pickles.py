@@ -0,0 +1,60 @@
+# scripts/migrate_chunk_pickles.py
+#
+# Converts pickled chunk lists (*_text_chunks.pkl) into the memory-mapped
+# chunk store (*_text_chunks.bin + .idx). Page spans saved alongside as
+# *_chunk_pages.pkl are carried over when present.
+#
+#   python -m scripts.migrate_chunk_pickles [--delete]
+
+import argparse, glob, os, pickle
+
+from configs.paths import UPLOADS_DIR
+from services.chunk_store import ChunkStore, ChunkStoreWriter, chunk_stem, store_paths
+
+
+def migrate(pkl_path, delete=False):
+    stem = chunk_stem(pkl_path)
+    with open(pkl_path, "rb") as f:
+        chunks = pickle.load(f)
+
+    pages_path = os.path.join(UPLOADS_DIR, f"{stem}_chunk_pages.pkl")
+    pages = [(0, 0)] * len(chunks)
+    if os.path.exists(pages_path):
+        with open(pages_path, "rb") as f:
+            pages = pickle.load(f)
+
+    with ChunkStoreWriter(stem, UPLOADS_DIR) as writer:
+        for text, (first, last) in zip(chunks, pages):
+            writer.add(text, first, last)
+
+    # Read it back before touching the original
+    store = ChunkStore(*store_paths(stem, UPLOADS_DIR))
+    if len(store) != len(chunks) or any(a != b for a, b in zip(store, chunks)):
+        raise RuntimeError(f"Verification failed for {pkl_path}")
+
+    if delete:
+        os.remove(pkl_path)
+        if os.path.exists(pages_path):
+            os.remove(pages_path)
+    return len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--delete", action="store_true", help="remove the .pkl files once migrated")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(UPLOADS_DIR, "*_text_chunks.pkl")))
+    if not paths:
+        print(f"No *_text_chunks.pkl found in {UPLOADS_DIR}")
+        return
+    for path in paths:
+        try:
+            n = migrate(path, delete=args.delete)
+            print(f"✅ {os.path.basename(path)}: {n} chunks")
+        except Exception as e:
+            print(f"❌ {os.path.basename(path)}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# services/answer_cache.py
+
+import re, logging, threading
+from collections import OrderedDict
+
+from configs.settings import ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_MATCH_DOC_IDS
+from .chunk_store import chunk_stem
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_query(query):
+    """Lowercase and strip punctuation/extra whitespace so trivial variants match."""
+    return " ".join(_WORD_RE.findall(query.lower()))
+
+
+class AnswerCache:
+    """
+    LRU cache of PDF-mode answers.
+
+    Answers are keyed by (document, normalized query). When `match_doc_ids`
+    is on they are also keyed by the chunk ids retrieval returned, in rank
+    order, so a paraphrase that retrieves the same chunks skips summarization
+    too. Order matters because the summary is built from the chunks in that
+    order.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, match_doc_ids=ANSWER_CACHE_MATCH_DOC_IDS):
+        self.max_entries = max_entries
+        self.match_doc_ids = match_doc_ids
+        self._by_query = OrderedDict()
+        self._by_docs = OrderedDict()
+        self._lock = threading.Lock()
+        self.query_hits = 0
+        self.doc_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_by_query(self, chunk_filename, query):
+        key = (chunk_stem(chunk_filename), normalize_query(query))
+        with self._lock:
+            answer = self._get_locked(self._by_query, key)
+            if answer is not None:
+                self.query_hits += 1
+            elif not self.match_doc_ids:
+                self.misses += 1
+            return answer
+
+    def get_by_docs(self, chunk_filename, doc_ids):
+        """Look up by retrieved chunk ids; call after a get_by_query miss."""
+        if not self.match_doc_ids:
+            return None
+        key = (chunk_stem(chunk_filename), tuple(doc_ids))
+        with self._lock:
+            answer = self._get_locked(self._by_docs, key)
+            if answer is not None:
+                self.doc_hits += 1
+            else:
+                self.misses += 1
+            return answer
+
+    def put(self, chunk_filename, query, doc_ids, answer):
+        stem = chunk_stem(chunk_filename)
+        with self._lock:
+            self._put_locked(self._by_query, (stem, normalize_query(query)), answer)
+            if self.match_doc_ids and doc_ids:
+                self._put_locked(self._by_docs, (stem, tuple(doc_ids)), answer)
+
+    def invalidate(self, chunk_filename):
+        """Drop every answer for a document, e.g. after it is re-indexed."""
+        stem = chunk_stem(chunk_filename)
+        with self._lock:
+            dropped = 0
+            for table in (self._by_query, self._by_docs):
+                for key in [k for k in table if k[0] == stem]:
+                    del table[key]
+                    dropped += 1
+            if dropped:
+                self.invalidations += 1
+                logging.debug(f"Answer cache invalidated {dropped} entries for {stem}")
+            return dropped
+
+    def clear(self):
+        with self._lock:
+            self._by_query.clear()
+            self._by_docs.clear()
+
+    def stats(self):
+        with self._lock:
+            hits = self.query_hits + self.doc_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._by_query) + len(self._by_docs),
+                "max_entries": self.max_entries,
+                "query_hits": self.query_hits,
+                "doc_id_hits": self.doc_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _get_locked(self, table, key):
+        answer = table.get(key)
+        if answer is not None:
+            table.move_to_end(key)
+        return answer
+
+    def _put_locked(self, table, key, answer):
+        table[key] = answer
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+            self.evictions += 1
+
+
+answer_cache = AnswerCache()
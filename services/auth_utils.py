@@ -3,6 +3,7 @@ from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 from services.database import get_user_by_email, get_db_session
+from services.principal_cache import principal_cache
 
 SECRET_KEY = "your-secret-key"  # Must match the one used for token creation
 ALGORITHM = "HS256"
@@ -26,8 +27,19 @@ async def get_current_user_id(
     except JWTError:
         raise credentials_exception
 
-    user = await get_user_by_email(db_session, email)
-    if user is None:
+    # Tokens carry the user id, but it is only trusted while the cache
+    # (refreshed from the database at most once per TTL) still maps the
+    # subject to that id, so deleted users are rejected. Older tokens
+    # without the claim resolve through the same cache.
+    claimed_id = payload.get("uid")
+    user_id = principal_cache.get(email)
+    if user_id is None:
+        user = await get_user_by_email(db_session, email)
+        if user is None:
+            raise credentials_exception
+        user_id = user.id
+        principal_cache.put(email, user_id)
+    if claimed_id is not None and claimed_id != user_id:
         raise credentials_exception
 
-    return user.id
+    return user_id
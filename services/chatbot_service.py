@@ -1,23 +1,24 @@
-from ctransformers import AutoModelForCausalLM
-from .colbert_retriever import ColBERTRetriever
+from .retriever_cache import retriever_cache
+from .multi_retriever import multi_search
+from .answer_cache import answer_cache
 from .summarization import TextSummarizer
+from .resource_governor import governor
+from .inference_scheduler import InferenceScheduler
+from .lazy_models import LazyModel
+from .inference_executor import DeadlineExceededError
 import logging
 import re
-import signal
+import time
 from configs.paths import MISTRAL_MODEL_PATH
 
 logging.basicConfig(level=logging.DEBUG)
 
-_model = None  # Global model reference
+def _load_mistral():
+    from ctransformers import AutoModelForCausalLM
 
-def start_model():
-    global _model
-    if _model is not None:
-        print("ℹ️ Mistral model already running.")
-        return
     print("⏳ Loading Mistral model...")
     try:
-        _model = AutoModelForCausalLM.from_pretrained(
+        model = AutoModelForCausalLM.from_pretrained(
             MISTRAL_MODEL_PATH,
             model_type="mistral",
             gpu_layers=15,
@@ -26,30 +27,50 @@ def start_model():
         print("✅ Mistral model loaded successfully on GPU!")
     except Exception as e:
         print(f"⚠️ GPU loading failed: {e}\nFalling back to CPU...")
-        _model = AutoModelForCausalLM.from_pretrained(
-            MISTRAL_MODEL_PATH,
-            model_type="mistral",
-            gpu_layers=0,
-            context_length=2048
-        )
+        model = load_cpu_context()
         print("✅ Mistral model loaded on CPU.")
+    return model
+
+def load_cpu_context():
+    """
+    Load another CPU instance of Mistral. The GGUF weights are memory-mapped,
+    so extra instances mostly cost their own KV cache.
+    """
+    from ctransformers import AutoModelForCausalLM
+
+    return AutoModelForCausalLM.from_pretrained(
+        MISTRAL_MODEL_PATH,
+        model_type="mistral",
+        gpu_layers=0,
+        context_length=2048
+    )
+
+# Models load on first use (or during warm-up, see main.py), so importing
+# this module is cheap for workers that never generate anything.
+mistral = LazyModel("mistral", _load_mistral)
+summarizer = LazyModel("summarizer", TextSummarizer)
+
+def start_model():
+    mistral.get()
 
 def stop_model():
-    global _model
-    if _model is not None:
+    if mistral.loaded:
         print("🛑 Stopping Mistral model...")
-        _model = None
+        mistral.unload()
         print("🧹 Model resources released.")
     else:
         print("ℹ️ Model is already stopped.")
 
 def get_model():
-    return _model
-
-# Initialize model on startup
-start_model()
+    """The Mistral model, loading it if needed; None if it can't be loaded."""
+    try:
+        return mistral.get()
+    except Exception as e:
+        logging.error(f"Mistral model could not be loaded: {e}")
+        return None
 
-summarizer = TextSummarizer()
+# All general-mode generation goes through the scheduler, which owns the model
+scheduler = InferenceScheduler(get_model, context_factory=load_cpu_context)
 
 MARKS_TOKENS = {
     "10M": 600,
@@ -81,21 +102,124 @@ def determine_response_type(query):
 
     return "default", MARKS_TOKENS["4M"]
 
-def timeout_handler(signum, frame):
-    raise TimeoutError("Response generation took too long")
+def build_general_prompt(model, query):
+    """Return the general-mode prompt (trimmed to 1024 tokens) and its token budget."""
+    prompt = f"### Instruction: Answer conversationally.\n\n### Query:\n{query}\n\n### Response:"
+    input_tokens = model.tokenize(prompt)
+    if len(input_tokens) > 1024:
+        input_tokens = input_tokens[:1024]
+        prompt = model.detokenize(input_tokens)
+
+    max_allowed_tokens = 2048 - len(input_tokens)
+    return prompt, min(512, max_allowed_tokens)
+
+TIMEOUT_MESSAGE = "⚠️ Response took too long. Try a shorter query."
+TRUNCATED_NOTE = "\n\n⚠️ Response cut short because it took too long."
+
+def deadline_passed(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+def generate_tokens(model, prompt, max_new_tokens, deadline=None, cancel_event=None, stats=None):
+    """
+    Yield generated text one token at a time.
+
+    The prompt is queued on the shared scheduler, which interleaves it with
+    other users' requests and stops it cleanly once `max_new_tokens` have been
+    produced, `deadline` (a time.monotonic() value) passes or `cancel_event`
+    is set. Unlike a SIGALRM timer this works on any thread and never leaves an
+    alarm armed. If `stats` is a dict, the stop reason and token count are
+    stored in it.
+    """
+    seq = scheduler.submit(
+        model.tokenize(prompt),
+        max_new_tokens,
+        deadline=deadline,
+        cancel_event=cancel_event,
+        temperature=0.7,
+        top_p=0.9
+    )
+    try:
+        yield from seq.iter_text()
+    finally:
+        seq.abandon()
+        if seq.stop_reason in ("cancelled", "deadline"):
+            logging.warning(f"Generation stopped early ({seq.stop_reason}) after {len(seq.generated)} tokens")
+        if stats is not None:
+            stats.update(stop_reason=seq.stop_reason, tokens=len(seq.generated))
+
+def _stop_check(deadline, cancel_event):
+    # For the PDF path: retrieval and summarization check this between steps
+    return lambda: deadline_passed(deadline) or (cancel_event is not None and cancel_event.is_set())
+
+def answer_across_documents(query, chunk_filenames, user_id=None, deadline=None, cancel_event=None):
+    """
+    PDF mode over several documents at once; their hits are merged by score.
+    With `user_id`, the user's consolidated index is used when it covers them.
+    """
+    should_stop = _stop_check(deadline, cancel_event)
+    try:
+        hits = multi_search(chunk_filenames, query, top_k=3, user_id=user_id,
+                            deadline=deadline, cancel_event=cancel_event)
+    except DeadlineExceededError:
+        return TIMEOUT_MESSAGE
+    except Exception as e:
+        logging.error(f"Multi-document retrieval failed: {e}")
+        return "⚠️ Error retrieving PDF content."
+
+    pdf_context = " ".join(hit.chunk for hit in hits)
+    if not pdf_context.strip():
+        return "⚠️ No relevant PDF content found for your query."
+    if should_stop():
+        return TIMEOUT_MESSAGE
+    summary = summarizer.get().summarize_large_text(pdf_context, should_stop=should_stop)
+    return summary if summary is not None else TIMEOUT_MESSAGE
+
+def generate_response(query, mode, chunk_filename=None, deadline=None, cancel_event=None,
+                      chunk_filenames=None, user_id=None):
+    """
+    Produce a complete response. `deadline` is a time.monotonic() value after
+    which we give up; callers normally run this through the inference executor,
+    which supplies both keyword arguments. In PDF mode, `chunk_filenames`
+    searches several documents (of user `user_id`) instead of `chunk_filename`.
+    """
+    if deadline_passed(deadline):
+        return TIMEOUT_MESSAGE
+
+    if mode == "pdf" and chunk_filenames:
+        return answer_across_documents(query, chunk_filenames, user_id=user_id,
+                                       deadline=deadline, cancel_event=cancel_event)
 
-def generate_response(query, mode, chunk_filename=None):
     if mode == "pdf":
         response_type, max_response_tokens = determine_response_type(query)
 
+        cached = answer_cache.get_by_query(chunk_filename, query)
+        if cached is not None:
+            return cached
+
         try:
-            retriever = ColBERTRetriever(chunk_filename)
-            pdf_context_chunks = retriever.search(query, top_k=3)
-            pdf_context = " ".join(pdf_context_chunks)
+            retriever = retriever_cache.get(chunk_filename)
+            hits = retriever.search_with_ids(query, top_k=3)
+            doc_ids = [doc_id for doc_id, _ in hits]
+
+            # A paraphrase that retrieves the same chunks gets the same summary
+            cached = answer_cache.get_by_docs(chunk_filename, doc_ids)
+            if cached is not None:
+                answer_cache.put(chunk_filename, query, doc_ids, cached)
+                return cached
+
+            pdf_context = " ".join(chunk for _, chunk in hits)
             
             if pdf_context.strip():
-                summarized_context = summarizer.summarize_large_text(pdf_context)
+                # Stop between steps once nobody is waiting for the answer,
+                # so the executor slot is freed
+                should_stop = _stop_check(deadline, cancel_event)
+                if should_stop():
+                    return TIMEOUT_MESSAGE
+                summarized_context = summarizer.get().summarize_large_text(pdf_context, should_stop=should_stop)
+                if summarized_context is None:
+                    return TIMEOUT_MESSAGE
                 logging.debug(f"Summarized PDF Context: {summarized_context}")
+                answer_cache.put(chunk_filename, query, doc_ids, summarized_context)
                 return summarized_context
             else:
                 return "⚠️ No relevant PDF content found for your query."
@@ -106,35 +230,57 @@ def generate_response(query, mode, chunk_filename=None):
     elif mode == "general":
         model = get_model()
         if model is None:
-            return "⚠️ Model is currently paused for processing. Please wait and try again."
-
-        prompt = f"### Instruction: Answer conversationally.\n\n### Query:\n{query}\n\n### Response:"
-        input_tokens = model.tokenize(prompt)
-        if len(input_tokens) > 1024:
-            input_tokens = input_tokens[:1024]
-            prompt = model.detokenize(input_tokens)
+            return "⚠️ Model is currently unavailable. Please wait and try again."
 
-        max_allowed_tokens = 2048 - len(input_tokens)
-        final_max_tokens = min(512, max_allowed_tokens)
+        prompt, final_max_tokens = build_general_prompt(model, query)
 
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(40)
+        # Only holds generation back when the box is genuinely short on memory
+        governor.wait_for_headroom()
 
+        stats = {}
         try:
-            response = model(
-                prompt,
-                max_new_tokens=final_max_tokens,
-                temperature=0.7,
-                top_p=0.9
-            )
-            signal.alarm(0)
-            return response
-        except TimeoutError:
-            return "⚠️ Response took too long. Try a shorter query."
+            response = "".join(generate_tokens(
+                model, prompt, final_max_tokens,
+                deadline=deadline, cancel_event=cancel_event, stats=stats
+            ))
         except Exception as e:
-            signal.alarm(0)
             return f"⚠️ Generation failed: {str(e)}"
 
+        if stats.get("stop_reason") == "deadline":
+            # Hand back what we have rather than throwing the work away
+            return response + TRUNCATED_NOTE if response.strip() else TIMEOUT_MESSAGE
+        return response
+
     else:
         return "⚠️ Invalid mode. Use 'pdf' or 'general'."
 
+def stream_response(query, mode, chunk_filename=None, deadline=None, cancel_event=None,
+                    chunk_filenames=None, user_id=None):
+    """
+    Yield the response piece by piece as it is produced.
+
+    General mode yields tokens straight from ctransformers; PDF mode yields the
+    summarized answer in one piece. Generation stops at the next token once
+    `deadline` passes or `cancel_event` (a threading.Event) is set, so the
+    model is freed for other users.
+    """
+    if mode != "general":
+        yield generate_response(query, mode, chunk_filename, deadline=deadline,
+                                chunk_filenames=chunk_filenames, user_id=user_id)
+        return
+
+    model = get_model()
+    if model is None:
+        yield "⚠️ Model is currently unavailable. Please wait and try again."
+        return
+
+    prompt, final_max_tokens = build_general_prompt(model, query)
+    governor.wait_for_headroom()
+
+    stats = {}
+    yield from generate_tokens(
+        model, prompt, final_max_tokens,
+        deadline=deadline, cancel_event=cancel_event, stats=stats
+    )
+    if stats.get("stop_reason") == "deadline":
+        yield TRUNCATED_NOTE
@@ -0,0 +1,171 @@
+# services/chunk_store.py
+#
+# On-disk chunk store: `{stem}_text_chunks.bin` holds every chunk's UTF-8
+# text back to back, `{stem}_text_chunks.idx` holds the offsets and page
+# spans. Both are opened with mmap, so opening a store costs nothing, a
+# chunk lookup touches only its own bytes, and processes that open the same
+# document share its pages through the OS page cache.
+#
+# .idx layout (native byte order):
+#   8 bytes   magic
+#   uint64    chunk count n
+#   uint64    n + 1 offsets into the .bin file
+#   uint32    n first pages
+#   uint32    n last pages
+
+import os, mmap, pickle, struct
+from array import array
+from pathlib import Path
+
+from configs.paths import UPLOADS_DIR
+
+MAGIC = b"W2PCHK01"
+_HEADER = struct.Struct("=8sQ")
+
+
+def chunk_filename(stem):
+    """The name clients use to refer to a document's chunks."""
+    return f"{stem}_text_chunks.bin"
+
+
+def chunk_stem(chunk_filename):
+    """Return the document stem shared by a chunk file and its index."""
+    return Path(chunk_filename).stem.replace("_text_chunks", "")
+
+
+def store_paths(stem, directory=UPLOADS_DIR):
+    base = os.path.join(directory, f"{stem}_text_chunks")
+    return base + ".bin", base + ".idx"
+
+
+def legacy_pickle_path(stem, directory=UPLOADS_DIR):
+    return os.path.join(directory, f"{stem}_text_chunks.pkl")
+
+
+class ChunkStoreWriter:
+    """Append chunks one at a time; `close()` publishes the store."""
+
+    def __init__(self, stem, directory=UPLOADS_DIR):
+        self.bin_path, self.idx_path = store_paths(stem, directory)
+        self._tmp_bin = self.bin_path + ".tmp"
+        self._bin = open(self._tmp_bin, "wb")
+        self._offsets = array("Q", [0])
+        self._first_pages = array("I")
+        self._last_pages = array("I")
+
+    def __len__(self):
+        return len(self._first_pages)
+
+    def add(self, text, first_page=0, last_page=0):
+        data = text.encode("utf-8")
+        self._bin.write(data)
+        self._offsets.append(self._offsets[-1] + len(data))
+        self._first_pages.append(first_page)
+        self._last_pages.append(last_page)
+
+    def close(self):
+        self._bin.close()
+        tmp_idx = self.idx_path + ".tmp"
+        with open(tmp_idx, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(self)))
+            self._offsets.tofile(f)
+            self._first_pages.tofile(f)
+            self._last_pages.tofile(f)
+        # Readers only ever see a complete pair
+        os.replace(self._tmp_bin, self.bin_path)
+        os.replace(tmp_idx, self.idx_path)
+        return self.bin_path
+
+    def abort(self):
+        self._bin.close()
+        for path in (self._tmp_bin, self.idx_path + ".tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ChunkStore:
+    """Read-only, memory-mapped view of a chunk store."""
+
+    def __init__(self, bin_path, idx_path):
+        self.path = bin_path
+        self.idx_path = idx_path
+        self._data = _map(bin_path)
+        self._idx = _map(idx_path)
+
+        magic, count = _HEADER.unpack_from(self._idx, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a chunk store index: {idx_path}")
+        view = memoryview(self._idx)
+        start = _HEADER.size
+        self._offsets = view[start:start + 8 * (count + 1)].cast("Q")
+        start += 8 * (count + 1)
+        self._first_pages = view[start:start + 4 * count].cast("I")
+        start += 4 * count
+        self._last_pages = view[start:start + 4 * count].cast("I")
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return self._data[self._offsets[i]:self._offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def pages(self, i):
+        """(first_page, last_page) of chunk `i`; 0 when unknown."""
+        return self._first_pages[i], self._last_pages[i]
+
+
+class PickledChunks:
+    """Stores written before the mmap format: a pickled list of strings."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._chunks = pickle.load(f)
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __getitem__(self, i):
+        return self._chunks[i]
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def pages(self, i):
+        return 0, 0
+
+
+def open_chunk_store(stem, directory=UPLOADS_DIR):
+    """Open a document's chunks, falling back to a legacy pickle."""
+    bin_path, idx_path = store_paths(stem, directory)
+    if os.path.exists(idx_path) and os.path.exists(bin_path):
+        return ChunkStore(bin_path, idx_path)
+    pkl_path = legacy_pickle_path(stem, directory)
+    if os.path.exists(pkl_path):
+        return PickledChunks(pkl_path)
+    raise FileNotFoundError(f"Chunk file not found: {bin_path}")
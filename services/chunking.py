@@ -0,0 +1,60 @@
+# services/chunking.py
+#
+# Sliding-window word chunking over a stream of pages. Produces exactly the
+# chunks the original whole-document implementation did:
+#
+#     words = " ".join(pages).split(" ")
+#     chunks = [" ".join(words[i:i + size]) for i in range(0, len(words), size - overlap)]
+#
+# while only ever holding one window of words in memory.
+
+from collections import namedtuple
+
+# `first_page`/`last_page` are 1-based and inclusive
+Chunk = namedtuple("Chunk", ["text", "first_page", "last_page"])
+
+
+class SlidingWindowChunker:
+    """
+    Feed pages in order with `feed()`, collect finished chunks from its
+    return value, then call `close()` for the trailing ones.
+    """
+
+    def __init__(self, chunk_size=512, chunk_overlap=50):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.step = chunk_size - chunk_overlap
+        self._words = []
+        self._pages = []
+        self._fed = False
+
+    def feed(self, page_number, text):
+        # Joining pages with " " and splitting on " " is the same as
+        # splitting each page on its own, so pages can be split independently.
+        words = text.split(" ")
+        self._words.extend(words)
+        self._pages.extend([page_number] * len(words))
+        self._fed = True
+
+        chunks = []
+        while len(self._words) >= self.chunk_size:
+            chunks.append(self._take())
+        return chunks
+
+    def close(self):
+        chunks = []
+        if not self._fed:
+            # "".split(" ") == [""], so an empty document gives one empty chunk
+            chunks.extend(self.feed(0, ""))
+        while self._words:
+            chunks.append(self._take())
+        return chunks
+
+    def _take(self):
+        words = self._words[:self.chunk_size]
+        pages = self._pages[:len(words)]
+        chunk = Chunk(" ".join(words), pages[0], pages[-1])
+        del self._words[:self.step]
+        del self._pages[:self.step]
+        return chunk
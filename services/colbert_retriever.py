@@ -1,53 +1,96 @@
 # services/colbert_retriever.py
 
-import os, pickle, logging
+import os, logging
 from colbert.searcher import Searcher
-from pathlib import Path
 
-UPLOAD_FOLDER = "/home/noyo/web2pdf/services/uploads"
-BASE_INDEX_PATH = "/home/noyo/web2pdf/services/experiments/default/indexes"
+from configs.paths import UPLOADS_DIR, COLBERT_INDEXES_DIR
+from configs.settings import RETRIEVAL_MODE, HYBRID_CANDIDATES
+from .chunk_store import open_chunk_store, chunk_stem
+from .query_encoder import query_encoder
+from .lexical_index import LexicalIndex
+
+UPLOAD_FOLDER = UPLOADS_DIR
+BASE_INDEX_PATH = COLBERT_INDEXES_DIR
+
 
 class ColBERTRetriever:
-    def __init__(self, chunk_filename):
+    kind = "colbert"
+
+    def __init__(self, chunk_filename, mode=RETRIEVAL_MODE, candidates=HYBRID_CANDIDATES):
         if not chunk_filename:
             raise ValueError("Chunk filename is required in PDF mode")
 
-        chunk_path = os.path.join(UPLOAD_FOLDER, chunk_filename)
-        if not os.path.exists(chunk_path):
-            raise FileNotFoundError(f"Chunk file not found: {chunk_path}")
-
-        with open(chunk_path, "rb") as f:
-            self.text_chunks = pickle.load(f)
+        # Chunks are memory-mapped, not loaded; the suffix of the name is
+        # irrelevant, old .pkl names resolve to the migrated store too.
+        stem = chunk_stem(chunk_filename)
+        self.text_chunks = open_chunk_store(stem, UPLOAD_FOLDER)
+        chunk_path = self.text_chunks.path
 
         # ✅ Derive index path from chunk filename
-        stem = Path(chunk_filename).stem.replace("_text_chunks", "")
         index_path = os.path.join(BASE_INDEX_PATH, f"{stem}_index")
 
         if not os.path.exists(index_path):
             raise FileNotFoundError(f"Index path not found: {index_path}")
 
+        self.chunk_path = chunk_path
+        self.index_path = index_path
         self.searcher = Searcher(index=index_path)
+        self.mode = mode
+        self.candidates = candidates
+        # Documents ingested before BM25 indexes existed just use full search
+        self.lexical = LexicalIndex.open(stem, UPLOAD_FOLDER) if mode == "hybrid" else None
+
+    def encode(self, query_text):
+        """Query embeddings, reusable across every index built with our checkpoint."""
+        return query_encoder.encode(query_text, self.searcher.encode)
+
+    def candidate_pids(self, query_text):
+        """BM25 candidates to rerank in hybrid mode; None means search everything."""
+        if self.lexical is None:
+            return None
+        return [pid for pid, _ in self.lexical.search(query_text, self.candidates)] or None
+
+    def dense_search(self, Q, top_k, query_text=None):
+        # With candidate pids ColBERT skips PLAID candidate generation and
+        # only scores those passages with full late interaction.
+        pids = self.candidate_pids(query_text) if query_text is not None else None
+        return self.searcher.dense_search(Q, k=top_k, pids=pids)
+
+    def search_encoded(self, Q, top_k=5, query_text=None):
+        """
+        Search with an already encoded query; returns (doc_id, chunk, score)
+        triples. Pass `query_text` to allow the BM25 prefilter in hybrid mode.
+        """
+        results = self.dense_search(Q, top_k, query_text)
+        pids, scores = results[0], results[-1]
+        return [
+            (int(pid), self.text_chunks[int(pid)], float(score))
+            for pid, score in zip(pids[:top_k], scores[:top_k])
+        ]
 
     def search(self, query_text, top_k=5):
+        return [chunk for _, chunk in self.search_with_ids(query_text, top_k)]
+
+    def search_with_ids(self, query_text, top_k=5):
+        """Like `search`, but returns (doc_id, chunk) pairs."""
         try:
-            results = self.searcher.search(query_text, k=top_k)
+            results = self.dense_search(self.encode(query_text), top_k, query_text)
             logging.debug(f"ColBERT search results: {results}")
 
             # Extract document IDs and scores
             doc_ids, scores = results[0], results[-1]
             
             # Retrieve chunks and remove duplicates
-            retrieved_chunks = []
+            retrieved = []
             seen_chunks = set()
             for doc_id in doc_ids[:top_k]:
                 chunk = self.text_chunks[int(doc_id)]
                 if chunk not in seen_chunks:
                     seen_chunks.add(chunk)
-                    retrieved_chunks.append(chunk)
+                    retrieved.append((int(doc_id), chunk))
             
-            return retrieved_chunks
+            return retrieved
         
         except Exception as e:
             logging.error(f"Search error: {e}")
             return []
-
@@ -0,0 +1,109 @@
+# services/db_engine.py
+#
+# Builds the application's async engine from configs/settings.py. Postgres
+# (asyncpg) gets a tunable connection pool and prepared statement cache;
+# a sqlite+aiosqlite URL runs everything against a local file (or memory)
+# without a database server.
+
+import time, threading
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+
+from configs.settings import (
+    DATABASE_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE_SECONDS, DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE,
+)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_errors = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _do_get(self):
+        started = time.monotonic()
+        try:
+            return super()._do_get()
+        except Exception:
+            # Pool timeout or failure to open a new connection
+            with self._stats_lock:
+                self.checkout_errors += 1
+            raise
+        finally:
+            waited = time.monotonic() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores ON DELETE CASCADE unless asked per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def make_engine(url=DATABASE_URL, echo=DB_ECHO, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT, pool_recycle=DB_POOL_RECYCLE_SECONDS,
+                pool_pre_ping=DB_POOL_PRE_PING, statement_cache_size=DB_STATEMENT_CACHE_SIZE):
+    url = make_url(url)
+
+    if url.get_backend_name() == "sqlite":
+        kwargs = {}
+        if url.database in (None, "", ":memory:"):
+            # Every session must see the same in-memory database
+            kwargs["poolclass"] = StaticPool
+        engine = create_async_engine(url, echo=echo, **kwargs)
+        event.listen(engine.sync_engine, "connect", _enable_sqlite_foreign_keys)
+        return engine
+
+    connect_args = {}
+    if url.get_driver_name() == "asyncpg":
+        # asyncpg's own statement cache plus SQLAlchemy's cache of prepared
+        # statements per connection; set 0 behind pgbouncer in transaction mode
+        connect_args["statement_cache_size"] = statement_cache_size
+        url = url.update_query_dict({"prepared_statement_cache_size": str(statement_cache_size)})
+
+    return create_async_engine(
+        url,
+        echo=echo,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine):
+    pool = engine.sync_engine.pool
+    stats = {"backend": engine.dialect.name, "pool": type(pool).__name__}
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return stats
+    stats.update({
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+    })
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "checkout_errors": pool.checkout_errors,
+                "avg_checkout_wait_seconds": round(pool._wait_total / pool.checkouts, 4) if pool.checkouts else 0.0,
+                "max_checkout_wait_seconds": round(pool._wait_max, 4),
+            })
+    return stats
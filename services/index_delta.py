@@ -0,0 +1,99 @@
+# services/index_delta.py
+#
+# Chunk-level diffing between a document and a previous version of it, so a
+# revised upload only encodes the chunks that actually changed.
+#
+# ColBERT passage ids (pids) are positions in the chunk store, so an
+# incrementally updated document keeps every chunk of its base at the same
+# position (chunks that are gone stay in the store but are removed from the
+# index) and appends new chunks at the end. Which pids are still live is
+# recorded per index in `chunk_hashes.json` as {chunk hash: [pids]}.
+#
+# Limitation: chunks are fixed-size word windows over the whole text
+# (services/chunking.py), so inserting or deleting even one word shifts
+# every later window and changes its hash. Only the chunks before the first
+# such edit are reused; a revision that adds or removes words early in the
+# document has a delta close to 1 and is rebuilt in full. Edits that keep
+# the word count (typo fixes, replaced figures) and edits near the end are
+# what the incremental path actually saves on.
+
+import os, json, hashlib
+from collections import namedtuple
+
+HASHES_FILENAME = "chunk_hashes.json"
+
+# `reused` maps positions in the new document to base pids; `added` lists
+# positions that must be encoded; `removed` lists base pids to drop.
+IndexDelta = namedtuple("IndexDelta", ["reused", "added", "removed"])
+
+
+def chunk_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def load_hashes(index_path, store=None):
+    """
+    Live pids of an index by chunk hash. Indexes built before hashes were
+    recorded were always full builds, so every store position is live.
+    """
+    path = os.path.join(index_path, HASHES_FILENAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    if store is None:
+        return None
+    hashes = {}
+    for pid, text in enumerate(store):
+        hashes.setdefault(chunk_hash(text), []).append(pid)
+    return hashes
+
+
+def save_hashes(index_path, hashes):
+    path = os.path.join(index_path, HASHES_FILENAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(hashes, f)
+    os.replace(tmp, path)
+
+
+def hashes_for_full_build(new_hashes):
+    hashes = {}
+    for pid, h in enumerate(new_hashes):
+        hashes.setdefault(h, []).append(pid)
+    return hashes
+
+
+def plan_delta(base_hashes, new_hashes):
+    """Match new chunks to live base pids by hash, one pid per occurrence."""
+    available = {h: list(pids) for h, pids in base_hashes.items()}
+    reused, added = {}, []
+    for position, h in enumerate(new_hashes):
+        pids = available.get(h)
+        if pids:
+            reused[position] = pids.pop(0)
+        else:
+            added.append(position)
+    removed = sorted(pid for pids in available.values() for pid in pids)
+    return IndexDelta(reused, added, removed)
+
+
+def min_delta_fraction(n_base_live, n_new):
+    """
+    Lower bound of `delta_fraction` from chunk counts alone: every chunk
+    the two versions' counts differ by has to be added or removed.
+    """
+    return abs(n_new - n_base_live) / max(1, n_new)
+
+
+def delta_fraction(delta, n_chunks):
+    """Share of the document that would have to change in the index."""
+    return (len(delta.added) + len(delta.removed)) / max(1, n_chunks)
+
+
+def hashes_after_update(delta, new_hashes, first_new_pid):
+    hashes = {}
+    for position, pid in delta.reused.items():
+        hashes.setdefault(new_hashes[position], []).append(pid)
+    for k, position in enumerate(delta.added):
+        hashes.setdefault(new_hashes[position], []).append(first_new_pid + k)
+    return hashes
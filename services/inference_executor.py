@@ -0,0 +1,141 @@
+# services/inference_executor.py
+
+import asyncio, time, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from configs.settings import INFERENCE_SLOTS, INFERENCE_MAX_QUEUE, INFERENCE_TIMEOUT_SECONDS
+
+
+class QueueFullError(Exception):
+    """Raised when the admission queue is full; maps to HTTP 429."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passes; maps to HTTP 503."""
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model calls on dedicated threads, off the event loop.
+
+    `slots` calls run at once; up to `max_queue` more wait for a slot and
+    anything beyond that is rejected immediately. Every call gets a
+    wall-clock deadline: work whose deadline passes while still queued is
+    skipped, and the callable receives `deadline` (a time.monotonic() value)
+    and `cancel_event` keyword arguments so it can stop early itself.
+    """
+
+    def __init__(self, slots=INFERENCE_SLOTS, max_queue=INFERENCE_MAX_QUEUE,
+                 timeout_seconds=INFERENCE_TIMEOUT_SECONDS, grace_seconds=2.0):
+        self.slots = max(1, slots)
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.grace_seconds = grace_seconds
+        self._executor = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def submit(self, fn, *args, timeout=None, cancel_event=None, **kwargs):
+        """
+        Admit `fn` and schedule it; returns an asyncio future.
+
+        Raises QueueFullError straight away when there is no room, so callers
+        can reject the request before starting a response.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue + max(0, self.slots - self._running):
+                self.rejected += 1
+                raise QueueFullError("The model is busy, please retry shortly.")
+            self._queued += 1
+            self.submitted += 1
+
+        cancel_event = cancel_event or threading.Event()
+        deadline = time.monotonic() + (timeout or self.timeout_seconds)
+        enqueued_at = time.monotonic()
+
+        def task():
+            started = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                waited = started - enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                if cancel_event.is_set() or started >= deadline:
+                    with self._lock:
+                        self.expired += 1
+                    raise DeadlineExceededError("Request expired while waiting for the model.")
+                result = fn(*args, deadline=deadline, cancel_event=cancel_event, **kwargs)
+                with self._lock:
+                    self.completed += 1
+                return result
+            except DeadlineExceededError:
+                raise
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_total += time.monotonic() - started
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, task)
+        future.deadline = deadline
+        future.cancel_event = cancel_event
+        return future
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Submit `fn` and wait for its result.
+
+        `fn` is expected to stop on its own at the deadline and return partial
+        output, so we allow a short grace period before giving up on it.
+        """
+        future = self.submit(fn, *args, timeout=timeout, **kwargs)
+        remaining = max(0.0, future.deadline - time.monotonic()) + self.grace_seconds
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            future.cancel_event.set()
+            raise DeadlineExceededError("Response took too long.")
+        except asyncio.CancelledError:
+            # Caller went away; don't start (or keep) generating for nobody
+            future.cancel_event.set()
+            raise
+
+    def stats(self):
+        with self._lock:
+            started = self.submitted - self._queued
+            return {
+                "slots": self.slots,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_seconds": round(self._wait_total / started, 3) if started else 0.0,
+                "max_wait_seconds": round(self._wait_max, 3),
+                "avg_run_seconds": round(self._run_total / started, 3) if started else 0.0,
+            }
+
+    def shutdown(self):
+        logging.info("Shutting down inference executor")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor()
@@ -0,0 +1,242 @@
+# services/inference_scheduler.py
+
+import time, queue, logging, threading
+from collections import deque
+
+from configs.settings import SCHEDULER_QUANTUM_TOKENS
+from .prefix_cache import PrefixCache
+
+_END = object()
+
+
+class _Sequence:
+    """One generation request as seen by the scheduler."""
+
+    def __init__(self, prompt_tokens, max_new_tokens, deadline, cancel_event,
+                 temperature, top_p):
+        self.prompt_tokens = list(prompt_tokens)
+        self.max_new_tokens = max_new_tokens
+        self.deadline = deadline
+        self.cancel_event = cancel_event
+        self.temperature = temperature
+        self.top_p = top_p
+        self.generated = []
+        self.preempted = False
+        self.stop_reason = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.first_token_at = None
+        self.finished_at = None
+        self._pending_bytes = b""
+        self._out = queue.Queue()
+        self._abandoned = False
+
+    @property
+    def context_tokens(self):
+        return self.prompt_tokens + self.generated
+
+    def abandon(self):
+        """Called when the consumer stops reading; generation stops next turn."""
+        self._abandoned = True
+
+    def should_stop(self):
+        if len(self.generated) >= self.max_new_tokens:
+            return "length"
+        if self._abandoned or (self.cancel_event is not None and self.cancel_event.is_set()):
+            return "cancelled"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "deadline"
+        return None
+
+    def emit(self, model, token):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.generated.append(token)
+        # A token may end part-way through a UTF-8 character; hold the bytes
+        # back until they decode.
+        self._pending_bytes += model.detokenize([token], decode=False)
+        try:
+            text = self._pending_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+        self._pending_bytes = b""
+        if text:
+            self._out.put(text)
+
+    def finish(self, reason, error=None):
+        self.stop_reason = reason
+        self.error = error
+        self.finished_at = time.monotonic()
+        if self._pending_bytes:
+            self._out.put(self._pending_bytes.decode("utf-8", errors="ignore"))
+            self._pending_bytes = b""
+        self._out.put(_END)
+
+    def iter_text(self):
+        """Yield decoded text pieces until the sequence finishes."""
+        while True:
+            item = self._out.get()
+            if item is _END:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+
+class InferenceScheduler:
+    """
+    Multiplexes concurrent generation requests over one model.
+
+    ctransformers keeps a single KV context per model and cannot decode
+    several sequences in one batched step, so instead a single decode thread
+    owns the model and round-robins active sequences, giving each up to
+    `quantum` tokens per turn; `quantum=0` runs each sequence to completion
+    in arrival order. KV state lives in a PrefixCache, so a sequence that
+    still owns its context resumes without re-evaluating anything and new
+    prompts only evaluate the tokens that aren't already resident.
+
+    A sequence is only preempted when every waiting sequence can get a
+    context of its own, so preemption never costs a re-evaluation; with a
+    single context that means sequences run to completion.
+    """
+
+    def __init__(self, model_provider, quantum=SCHEDULER_QUANTUM_TOKENS, history=256,
+                 context_factory=None):
+        self.quantum = quantum
+        self.prefix_cache = PrefixCache(model_provider, context_factory=context_factory)
+        self._active = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.tokens_generated = 0
+        self.preemptions = 0
+        self.reeval_tokens = 0
+        self._decode_seconds = 0.0
+        self._ttft = deque(maxlen=history)
+        self._latency = deque(maxlen=history)
+
+    def submit(self, prompt_tokens, max_new_tokens, deadline=None, cancel_event=None,
+               temperature=0.7, top_p=0.9):
+        """Queue a sequence; consume it with `seq.iter_text()`."""
+        seq = _Sequence(prompt_tokens, max_new_tokens, deadline, cancel_event, temperature, top_p)
+        with self._stats_lock:
+            self._pending += 1
+        with self._cond:
+            self._ensure_thread()
+            self._active.append(seq)
+            self._cond.notify()
+        return seq
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "quantum": self.quantum,
+                "active": self._pending,
+                "completed": self.completed,
+                "tokens_generated": self.tokens_generated,
+                "tokens_per_second": round(self.tokens_generated / self._decode_seconds, 2) if self._decode_seconds else 0.0,
+                "preemptions": self.preemptions,
+                "reeval_tokens": self.reeval_tokens,
+                "reeval_tokens_per_preemption": (
+                    round(self.reeval_tokens / self.preemptions, 1) if self.preemptions else 0.0
+                ),
+                "ttft_seconds": _percentiles(self._ttft),
+                "latency_seconds": _percentiles(self._latency),
+                "prefix_cache": self.prefix_cache.stats(),
+            }
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+                seq = self._active.popleft()
+
+            try:
+                finished = self._run_turn(seq)
+            except Exception as e:
+                logging.error(f"Generation failed: {e}")
+                self.prefix_cache.discard(seq)
+                seq.finish("error", error=e)
+                finished = True
+
+            if finished:
+                self._record(seq)
+            else:
+                with self._cond:
+                    self._active.append(seq)
+
+    def _run_turn(self, seq):
+        reason = seq.should_stop()
+        if reason:
+            seq.finish(reason)
+            return True
+
+        started = time.monotonic()
+        ctx = self.prefix_cache.prepare(seq.context_tokens, seq, resume=seq.preempted)
+        model = ctx.model
+        if seq.preempted and ctx.evaluated:
+            # Its context was taken while it waited; this is what preempting cost
+            with self._stats_lock:
+                self.reeval_tokens += ctx.evaluated
+
+        produced = 0
+        try:
+            while True:
+                reason = seq.should_stop()
+                if reason:
+                    seq.finish(reason)
+                    return True
+                if self.quantum and produced >= self.quantum and self._can_preempt():
+                    seq.preempted = True
+                    with self._stats_lock:
+                        self.preemptions += 1
+                    return False
+
+                token = model.sample(temperature=seq.temperature, top_p=seq.top_p)
+                if model.is_eos_token(token):
+                    seq.finish("eos")
+                    return True
+                model.eval([token])
+                ctx.tokens.append(token)
+                seq.emit(model, token)
+                produced += 1
+        finally:
+            with self._stats_lock:
+                self.tokens_generated += produced
+                self._decode_seconds += time.monotonic() - started
+
+    def _can_preempt(self):
+        # Worth it only if someone is waiting and every waiting sequence can
+        # run on its own context, leaving ours (and its KV state) untouched
+        with self._cond:
+            waiting = list(self._active)
+        if not waiting:
+            return False
+        homeless = sum(1 for other in waiting if not self.prefix_cache.holds(other))
+        return homeless <= self.prefix_cache.available_contexts()
+
+    def _record(self, seq):
+        self.prefix_cache.release(seq)
+        with self._stats_lock:
+            self._pending -= 1
+            self.completed += 1
+            if seq.first_token_at is not None:
+                self._ttft.append(seq.first_token_at - seq.submitted_at)
+            self._latency.append(seq.finished_at - seq.submitted_at)
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.5), 3), "p95": round(pick(0.95), 3), "max": round(ordered[-1], 3)}
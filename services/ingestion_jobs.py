@@ -0,0 +1,277 @@
+# services/ingestion_jobs.py
+
+import asyncio, logging, time, uuid
+from datetime import datetime
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from configs.settings import INGESTION_CONCURRENCY, INGESTION_MAX_PENDING
+from .database import AsyncSessionLocal, IngestionJob, UserFile, PdfContent
+from .process_pdf import PDFProcessor
+from .user_index import user_indexes
+from .pdf_contents import attach_user_file, find_previous_version, CONTENT_PENDING, CONTENT_READY, CONTENT_FAILED
+
+JOB_QUEUED = "queued"
+JOB_EXTRACTING = "extracting"
+JOB_CHUNKING = "chunking"  # no longer reported; kept for jobs recorded by older versions
+JOB_INDEXING = "indexing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_EXTRACTING, JOB_CHUNKING, JOB_INDEXING)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class _JobTracker:
+    """Persists stage transitions and per-stage timings for one job."""
+
+    def __init__(self, job_id, content_id=None):
+        self.job_id = job_id
+        self.content_id = content_id
+        self.timings = {}
+        self._stage = None
+        self._stage_started = None
+
+    def _close_stage(self):
+        if self._stage is not None:
+            self.timings[self._stage] = round(time.monotonic() - self._stage_started, 3)
+
+    async def update(self, stage, percent):
+        self._close_stage()
+        self._stage = stage
+        self._stage_started = time.monotonic()
+        await _update_jobs(self.job_id, self.content_id, status=stage, progress=percent, timings=dict(self.timings))
+
+    def finish(self):
+        self._close_stage()
+        self._stage = None
+        return dict(self.timings)
+
+
+def _active_jobs_filter(job_id, content_id):
+    # Jobs for the same content share one run, so they move together
+    if content_id is None:
+        return (IngestionJob.id == job_id,)
+    return (IngestionJob.content_id == content_id, IngestionJob.status.in_(ACTIVE_STATES))
+
+
+async def _update_jobs(job_id, content_id, **fields):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(IngestionJob)
+            .where(*_active_jobs_filter(job_id, content_id))
+            .values(**fields)
+        )
+        await db.commit()
+
+
+class IngestionQueue:
+    """
+    Runs PDF ingestion jobs in the background.
+
+    At most `concurrency` jobs are processed at once and at most
+    `max_pending` may be waiting or running; further submissions are
+    rejected with QueueFullError so uploads can't pile up unbounded work.
+    """
+
+    def __init__(self, concurrency=INGESTION_CONCURRENCY, max_pending=INGESTION_MAX_PENDING):
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self._semaphore = None
+        self._tasks = set()
+        self._running = 0
+
+    @property
+    def pending(self):
+        return len(self._tasks)
+
+    async def create_job(self, db, user_id, filename, file_path, content_id=None, schedule=True):
+        """
+        Insert a queued job row and schedule it; returns the job.
+
+        Pass `schedule=False` when another job is already processing the same
+        content: this job is then completed together with that one, or right
+        here if that run finished before this job was committed.
+        """
+        if schedule and self.pending >= self.max_pending:
+            raise QueueFullError("Too many PDFs are being processed, please retry shortly.")
+
+        job = IngestionJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            file_path=file_path,
+            content_id=content_id,
+            status=JOB_QUEUED,
+            progress=0,
+        )
+        db.add(job)
+        await db.commit()
+        if schedule:
+            self._schedule(job.id)
+        elif content_id is not None and await self._settle_rider(job.id, content_id):
+            await db.refresh(job)
+        return job
+
+    async def _settle_rider(self, job_id, content_id):
+        """
+        Finish an unscheduled job whose content is no longer pending: the
+        run it was riding along with may have collected its siblings before
+        this job existed. Returns whether the job was finished.
+        """
+        async with AsyncSessionLocal() as db:
+            content = await db.get(PdfContent, content_id)
+            if content is None or content.status == CONTENT_PENDING:
+                return False
+            # The run's commit sets the content status and its jobs' states
+            # together, so a job still active here was not among them
+            job = await db.get(IngestionJob, job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+            if content.status == CONTENT_READY:
+                await self._finish_jobs(db, job_id, content, timings={}, siblings=False)
+                return True
+            job.status = JOB_FAILED
+            job.error = "Processing of this file failed"
+            job.finished_at = datetime.utcnow()
+            await db.commit()
+            return True
+
+    async def resume_pending(self):
+        """Re-queue jobs left unfinished by a previous process."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(IngestionJob.id, IngestionJob.content_id)
+                .where(IngestionJob.status.in_(ACTIVE_STATES))
+                .order_by(IngestionJob.created_at.asc())
+            )
+            rows = result.all()
+
+        scheduled_contents = set()
+        for job_id, content_id in rows:
+            await _update_jobs(job_id, content_id, status=JOB_QUEUED, progress=0)
+            # One run per content; the other jobs for it finish alongside
+            if content_id is not None:
+                if content_id in scheduled_contents:
+                    continue
+                scheduled_contents.add(content_id)
+            self._schedule(job_id)
+        if rows:
+            print(f"🔁 Resumed {len(rows)} ingestion job(s).")
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": self._running,
+        }
+
+    def _schedule(self, job_id):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job_id):
+        async with self._semaphore:
+            self._running += 1
+            try:
+                await self._process(job_id)
+            except Exception:
+                logging.exception(f"Ingestion job {job_id} crashed")
+            finally:
+                self._running -= 1
+
+    async def _process(self, job_id):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(IngestionJob, job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return
+            content_id, file_path = job.content_id, job.file_path
+            content = await db.get(PdfContent, content_id) if content_id is not None else None
+            if content is not None and content.status == CONTENT_READY:
+                # Someone else's upload of the same file finished first
+                await self._finish_jobs(db, job_id, content, timings={})
+                return
+            base = None
+            if content is not None:
+                base = await find_previous_version(db, job.user_id, job.filename, exclude_content_id=content_id)
+            base_pdf_path = base.file_path if base is not None else None
+
+        await _update_jobs(job_id, content_id, started_at=datetime.utcnow())
+        tracker = _JobTracker(job_id, content_id)
+        processor = PDFProcessor()
+        try:
+            chunk_filename = await processor.process_and_store(
+                file_path, progress=tracker.update, base_pdf_path=base_pdf_path
+            )
+        except Exception as e:
+            logging.error(f"Ingestion job {job_id} failed: {e}")
+            async with AsyncSessionLocal() as db:
+                if content_id is not None:
+                    content = await db.get(PdfContent, content_id)
+                    content.status = CONTENT_FAILED
+                await db.execute(
+                    update(IngestionJob)
+                    .where(*_active_jobs_filter(job_id, content_id))
+                    .values(
+                        status=JOB_FAILED,
+                        error=str(e),
+                        timings={**tracker.finish(), **processor.metrics},
+                        finished_at=datetime.utcnow(),
+                    )
+                )
+                await db.commit()
+            return
+
+        async with AsyncSessionLocal() as db:
+            content = None
+            if content_id is not None:
+                content = await db.get(PdfContent, content_id)
+                content.status = CONTENT_READY
+                content.chunk_filename = chunk_filename
+            await self._finish_jobs(db, job_id, content, timings={**tracker.finish(), **processor.metrics})
+
+    async def _finish_jobs(self, db, job_id, content, timings, siblings=True):
+        """Mark the job (and any siblings sharing its content) done and give each user their file."""
+        content_id = content.id if content is not None and siblings else None
+        result = await db.execute(
+            select(IngestionJob).where(*_active_jobs_filter(job_id, content_id), IngestionJob.status.in_(ACTIVE_STATES))
+        )
+        user_ids = set()
+        for job in result.scalars().all():
+            user_ids.add(job.user_id)
+            if content is not None:
+                await attach_user_file(db, content, job.user_id, job.filename)
+            else:
+                db.add(UserFile(user_id=job.user_id, filename=job.filename, file_path=job.file_path))
+            job.status = JOB_DONE
+            job.progress = 100
+            job.timings = timings
+            job.finished_at = datetime.utcnow()
+        await db.commit()
+        for user_id in user_ids:
+            user_indexes.schedule_rebuild(user_id)
+
+
+ingestion_queue = IngestionQueue()
+
+
+def job_to_dict(job):
+    return {
+        "job_id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "timings": job.timings or {},
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
@@ -0,0 +1,118 @@
+# services/ingestion_worker.py
+#
+# Code that runs inside the ingestion worker processes. Workers are started
+# with the "spawn" method, so this module must stay cheap to import: no chat
+# models, no database, and ColBERT is only imported inside the task itself.
+
+import os, resource, logging, threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from configs.settings import (
+    INGESTION_WORKER_PROCESSES,
+    INGESTION_WORKER_THREADS,
+    INGESTION_WORKER_MEMORY_MB,
+    EXTRACTION_WORKER_PROCESSES,
+)
+
+_pool = None
+_extraction_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(threads, memory_mb):
+    # Keep indexing from competing with the LLM for every core
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    import torch
+    torch.set_num_threads(threads)
+
+    if memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def build_index(index_path, chunk_path, checkpoint_path):
+    from colbert.indexer import Indexer
+    from .chunk_store import ChunkStore
+
+    # Read the chunks here rather than shipping them through the pool pipe
+    store = ChunkStore(chunk_path, os.path.splitext(chunk_path)[0] + ".idx")
+    indexer = Indexer(checkpoint=checkpoint_path)
+    indexer.index(name=index_path, collection=list(store), overwrite=True)
+    return index_path
+
+
+def update_index(index_path, chunk_path, positions, removed_pids, checkpoint_path):
+    """
+    Apply a delta to an existing index in place: drop `removed_pids` and
+    encode the chunks at `positions` of the chunk store. Returns the pids
+    ColBERT assigned to the added chunks.
+    """
+    from colbert import Searcher
+    from colbert.index_updater import IndexUpdater
+    from .chunk_store import ChunkStore
+
+    store = ChunkStore(chunk_path, os.path.splitext(chunk_path)[0] + ".idx")
+    searcher = Searcher(index=index_path, checkpoint=checkpoint_path)
+    updater = IndexUpdater(searcher.config, searcher, checkpoint_path)
+    if removed_pids:
+        updater.remove(removed_pids)
+    new_pids = updater.add([store[i] for i in positions]) if positions else []
+    updater.persist_to_disk()
+    return [int(pid) for pid in new_pids]
+
+
+def page_count(pdf_path):
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def extract_pages(pdf_path, start, stop):
+    """Text of pages [start, stop), each flattened to a single line."""
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        return [
+            doc[i].get_text("text").replace("\n", " ").strip()
+            for i in range(start, stop)
+        ]
+
+
+def get_ingestion_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, INGESTION_WORKER_PROCESSES),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(INGESTION_WORKER_THREADS, INGESTION_WORKER_MEMORY_MB),
+            )
+            logging.info("Started ingestion worker pool")
+        return _pool
+
+
+def get_extraction_pool():
+    # Separate from the indexing pool: extraction only needs PyMuPDF, so
+    # these workers skip the torch setup and start quickly.
+    global _extraction_pool
+    with _pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=max(1, EXTRACTION_WORKER_PROCESSES),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logging.info("Started extraction worker pool")
+        return _extraction_pool
+
+
+def shutdown_ingestion_pool():
+    global _pool, _extraction_pool
+    with _pool_lock:
+        for pool in (_pool, _extraction_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        _pool = _extraction_pool = None
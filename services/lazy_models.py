@@ -0,0 +1,67 @@
+# services/lazy_models.py
+
+import time, logging, threading
+
+_registry = {}
+
+
+class LazyModel:
+    """
+    A model loaded on first use rather than at import time. Concurrent
+    first callers wait for a single load; a failed load is retried on the
+    next call.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+        self._loading = False
+        self.load_seconds = None
+        self.error = None
+        _registry[name] = self
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self):
+        value = self._value
+        if value is not None:
+            return value
+        with self._lock:
+            if self._value is None:
+                self._loading = True
+                started = time.monotonic()
+                try:
+                    self._value = self._loader()
+                    self.error = None
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self._loading = False
+                self.load_seconds = round(time.monotonic() - started, 3)
+                logging.info(f"Loaded {self.name} in {self.load_seconds}s")
+            return self._value
+
+    def unload(self):
+        with self._lock:
+            self._value = None
+
+    def status(self):
+        return {
+            "loaded": self.loaded,
+            "loading": self._loading,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+def get_lazy_model(name):
+    return _registry.get(name)
+
+
+def model_status():
+    return {name: model.status() for name, model in _registry.items()}
@@ -0,0 +1,80 @@
+# services/lexical_index.py
+#
+# BM25 inverted index over a document's chunks, stored next to its chunk
+# store as `{stem}_text_chunks.bm25`. Pure Python and cheap to build, so it
+# is written for every document during ingestion.
+
+import os, re, json, math, heapq
+from collections import Counter
+
+from configs.paths import UPLOADS_DIR
+from configs.settings import BM25_K1, BM25_B
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with what which who how why when where do does".split()
+)
+
+
+def tokenize(text):
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def lexical_index_path(stem, directory=UPLOADS_DIR):
+    return os.path.join(directory, f"{stem}_text_chunks.bm25")
+
+
+def build_lexical_index(stem, store, pids, directory=UPLOADS_DIR):
+    """Index the chunks `pids` of `store` and write the index for `stem`."""
+    postings = {}
+    doc_lens = {}
+    for pid in pids:
+        terms = Counter(tokenize(store[pid]))
+        doc_lens[pid] = sum(terms.values())
+        for term, tf in terms.items():
+            postings.setdefault(term, []).append([pid, tf])
+
+    path = lexical_index_path(stem, directory)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"doc_lens": doc_lens, "postings": postings}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+class LexicalIndex:
+    def __init__(self, path, k1=BM25_K1, b=BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        with open(path) as f:
+            data = json.load(f)
+        self._postings = data["postings"]
+        self._doc_lens = {int(pid): n for pid, n in data["doc_lens"].items()}
+        self._n_docs = len(self._doc_lens)
+        self._avg_len = sum(self._doc_lens.values()) / self._n_docs if self._n_docs else 0.0
+
+    @classmethod
+    def open(cls, stem, directory=UPLOADS_DIR):
+        """The document's index, or None if it has none."""
+        path = lexical_index_path(stem, directory)
+        return cls(path) if os.path.exists(path) else None
+
+    def __len__(self):
+        return self._n_docs
+
+    def search(self, query_text, k=10):
+        """Top `k` (pid, score) pairs by BM25, best first."""
+        if not self._n_docs:
+            return []
+        scores = {}
+        for term in set(tokenize(query_text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self._n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lens[pid] / self._avg_len)
+                scores[pid] = scores.get(pid, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
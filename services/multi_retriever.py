@@ -0,0 +1,111 @@
+# services/multi_retriever.py
+#
+# Search several PDFs with one query. The searches run in parallel and their
+# hits are merged by score, keeping track of which document each came from.
+# ColBERT indexes share one checkpoint, so the query is encoded once for all
+# of them (the query encoder cache hands out the same embeddings).
+#
+# Documents may be served by different backends (load_retriever falls back
+# to BM25 where a ColBERT index is missing), and MaxSim and BM25 scores are
+# on unrelated scales. When a search mixes kinds, each kind's scores are
+# min-max normalised over all of its hits before merging.
+
+import time, logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from configs.settings import MULTI_SEARCH_THREADS
+from .inference_executor import DeadlineExceededError
+from .retriever_cache import retriever_cache
+from .user_index import user_indexes
+
+SearchHit = namedtuple("SearchHit", ["chunk_filename", "doc_id", "chunk", "score", "pages"])
+
+_pool = ThreadPoolExecutor(max_workers=max(1, MULTI_SEARCH_THREADS), thread_name_prefix="multi-search")
+
+
+def _search_one(chunk_filename, query_text, k):
+    retriever = retriever_cache.get(chunk_filename)
+    Q = retriever.encode(query_text)
+    return retriever.kind, [
+        SearchHit(chunk_filename, doc_id, chunk, score, retriever.text_chunks.pages(doc_id))
+        for doc_id, chunk, score in retriever.search_encoded(Q, k, query_text)
+    ]
+
+
+def _merge(hits_by_kind):
+    """All hits best first; scores are rescaled to [0, 1] per kind if kinds are mixed."""
+    if len(hits_by_kind) == 1:
+        (hits,) = hits_by_kind.values()
+        return sorted(hits, key=lambda hit: hit.score, reverse=True)
+    merged = []
+    for hits in hits_by_kind.values():
+        low = min(hit.score for hit in hits)
+        span = max(hit.score for hit in hits) - low
+        merged.extend(hit._replace(score=(hit.score - low) / span if span else 1.0) for hit in hits)
+    merged.sort(key=lambda hit: hit.score, reverse=True)
+    return merged
+
+
+def _search_consolidated(index, Q, k, query_text):
+    retriever = index.retriever
+    hits = []
+    for pid, chunk, score in retriever.search_encoded(Q, k, query_text):
+        chunk_filename, doc_id = index.resolve(pid)
+        hits.append(SearchHit(chunk_filename, doc_id, chunk, score, retriever.text_chunks.pages(pid)))
+    return hits
+
+
+def multi_search(chunk_filenames, query_text, top_k=5, user_id=None, deadline=None, cancel_event=None):
+    """
+    Top `top_k` chunks across all `chunk_filenames`, best first. Uses the
+    user's consolidated index when it covers exactly these documents.
+
+    Raises DeadlineExceededError once `deadline` (a time.monotonic() value)
+    passes or `cancel_event` is set; searches not yet started are dropped.
+    """
+    chunk_filenames = list(dict.fromkeys(chunk_filenames))
+    if not chunk_filenames:
+        return []
+
+    consolidated = user_indexes.lookup(user_id, chunk_filenames)
+    if consolidated is not None:
+        Q = consolidated.retriever.encode(query_text)
+        return _dedupe(_search_consolidated(consolidated, Q, top_k, query_text), top_k)
+
+    futures = [(name, _pool.submit(_search_one, name, query_text, top_k)) for name in chunk_filenames]
+    hits_by_kind = {}
+    for i, (name, future) in enumerate(futures):
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                raise DeadlineExceededError("Search was cancelled.")
+            try:
+                kind, hits = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                if future.done():
+                    raise  # the search itself timed out
+                raise DeadlineExceededError("Search took too long.")
+        except DeadlineExceededError:
+            for _, pending in futures[i:]:
+                pending.cancel()
+            raise
+        except Exception as e:
+            # One broken document shouldn't fail the whole search
+            logging.error(f"Search in {name} failed: {e}")
+            continue
+        if hits:
+            hits_by_kind.setdefault(kind, []).extend(hits)
+    return _dedupe(_merge(hits_by_kind), top_k)
+
+
+def _dedupe(hits, top_k):
+    seen, results = set(), []
+    for hit in hits:
+        if hit.chunk in seen:
+            continue
+        seen.add(hit.chunk)
+        results.append(hit)
+        if len(results) == top_k:
+            break
+    return results
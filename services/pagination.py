@@ -0,0 +1,26 @@
+# services/pagination.py
+#
+# Opaque keyset cursors. A cursor encodes the sort key of the last row a
+# client has seen, so the next page is a plain index range scan no matter
+# how deep it is (unlike OFFSET, which reads and discards every skipped row).
+
+import json, base64
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(timestamp, row_id):
+    raw = json.dumps([timestamp.isoformat() if timestamp else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverse of `encode_cursor`; raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,121 @@
+# services/password_hasher.py
+
+import asyncio, time, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from configs.settings import PASSWORD_HASH_THREADS, PASSWORD_HASH_MAX_QUEUE, PASSWORD_BCRYPT_ROUNDS
+
+
+class HasherBusyError(Exception):
+    """Raised when too many password operations are waiting; maps to HTTP 503."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so a hash (~100-300 ms of
+    CPU) never blocks the event loop. At most `threads` operations run at
+    once and up to `max_queue` more wait; beyond that callers get
+    HasherBusyError instead of piling up behind a login burst.
+
+    Hashes are made with `rounds`; `verify_and_update` also returns a fresh
+    hash when a stored one was made with a different cost, so changing
+    PASSWORD_BCRYPT_ROUNDS migrates users as they log in.
+    """
+
+    def __init__(self, threads=PASSWORD_HASH_THREADS, max_queue=PASSWORD_HASH_MAX_QUEUE,
+                 rounds=PASSWORD_BCRYPT_ROUNDS):
+        self.threads = max(1, threads)
+        self.max_queue = max_queue
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.hashes = 0
+        self.verifications = 0
+        self.failed_verifications = 0
+        self.rehashes = 0
+        self.rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._queued >= self.max_queue + max(0, self.threads - self._running):
+                self.rejected += 1
+                raise HasherBusyError("Too many sign-ins at once, please retry shortly.")
+            self._queued += 1
+        enqueued_at = time.monotonic()
+
+        def task():
+            started = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                waited = started - enqueued_at
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_total += time.monotonic() - started
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, task)
+
+    async def hash(self, password):
+        hashed = await self._run(self.context.hash, password)
+        with self._lock:
+            self.hashes += 1
+        return hashed
+
+    async def verify(self, password, hashed):
+        ok, _ = await self.verify_and_update(password, hashed)
+        return ok
+
+    async def verify_and_update(self, password, hashed):
+        """(valid, new_hash); new_hash is set when the stored hash should be replaced."""
+        ok, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        with self._lock:
+            self.verifications += 1
+            if not ok:
+                self.failed_verifications += 1
+            elif new_hash is not None:
+                self.rehashes += 1
+        return ok, new_hash
+
+    def stats(self):
+        with self._lock:
+            done = self.hashes + self.verifications
+            return {
+                "threads": self.threads,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "hashes": self.hashes,
+                "verifications": self.verifications,
+                "failed_verifications": self.failed_verifications,
+                "rehashes": self.rehashes,
+                "rejected": self.rejected,
+                "avg_wait_seconds": round(self._wait_total / done, 3) if done else 0.0,
+                "max_wait_seconds": round(self._wait_max, 3),
+                "avg_run_seconds": round(self._run_total / done, 3) if done else 0.0,
+            }
+
+    def shutdown(self):
+        logging.info("Shutting down password hasher")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
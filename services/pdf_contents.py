@@ -0,0 +1,174 @@
+# services/pdf_contents.py
+#
+# Content-addressed storage for uploaded PDFs. Identical files are stored,
+# chunked and indexed once; every upload of them becomes a UserFile row
+# pointing at the shared PdfContent, which is reference counted so the files
+# are only removed when the last user lets go of them.
+
+import os, shutil, hashlib, logging, uuid
+from pathlib import Path
+
+from sqlalchemy import func, update, delete
+from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from configs.paths import UPLOADS_DIR, COLBERT_INDEXES_DIR
+from .database import PdfContent, UserFile
+from .retriever_cache import retriever_cache
+from .answer_cache import answer_cache
+from .chunk_store import store_paths, legacy_pickle_path
+from .lexical_index import lexical_index_path
+
+CONTENT_PENDING = "pending"
+CONTENT_READY = "ready"
+CONTENT_FAILED = "failed"
+
+_READ_SIZE = 1024 * 1024
+
+
+async def save_upload_hashed(upload, directory=UPLOADS_DIR):
+    """
+    Stream an UploadFile to a temporary file while hashing it.
+    Returns (sha256 hex digest, temporary path).
+    """
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = os.path.join(directory, f".upload_{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as buf:
+            while True:
+                block = await upload.read(_READ_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                buf.write(block)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest(), tmp_path
+
+
+def storage_name(sha256, filename):
+    """On-disk name for a content; the stem names its chunks and index too."""
+    return f"{sha256[:32]}_{filename}"
+
+
+def original_filename(stored_name):
+    """Inverse of `storage_name`."""
+    return stored_name[33:]
+
+
+async def get_content_by_hash(db, sha256):
+    result = await db.execute(select(PdfContent).where(PdfContent.sha256 == sha256))
+    return result.scalar_one_or_none()
+
+
+async def attach_user_file(db, content, user_id, filename):
+    """Give a user a file entry for an already stored content. Caller commits."""
+    user_file = UserFile(
+        user_id=user_id,
+        filename=filename,
+        file_path=content.file_path,
+        content_id=content.id,
+    )
+    db.add(user_file)
+    await _add_reference(db, content, 1)
+    return user_file
+
+
+async def _add_reference(db, content, delta):
+    """
+    Change `content`'s reference count by `delta` in one UPDATE, so
+    concurrent uploads and deletes of the same file can't lose updates.
+    Returns the new count, or None if the content row is gone.
+    """
+    result = await db.execute(
+        update(PdfContent)
+        .where(PdfContent.id == content.id)
+        .values(ref_count=PdfContent.ref_count + delta)
+        .returning(PdfContent.ref_count)
+        .execution_options(synchronize_session=False)
+    )
+    ref_count = result.scalar_one_or_none()
+    if ref_count is not None:
+        # Reflect the new count without the ORM writing the old one back
+        set_committed_value(content, "ref_count", ref_count)
+    return ref_count
+
+
+async def find_previous_version(db, user_id, stored_name, exclude_content_id=None):
+    """
+    The user's most recent ready content uploaded under the same original
+    filename, i.e. the likely previous edition of a re-uploaded document.
+    """
+    stmt = (
+        select(PdfContent)
+        .join(UserFile, UserFile.content_id == PdfContent.id)
+        .where(
+            UserFile.user_id == user_id,
+            func.substr(UserFile.filename, 34) == original_filename(stored_name),
+            PdfContent.status == CONTENT_READY,
+        )
+        .order_by(UserFile.uploaded_at.desc())
+        .limit(1)
+    )
+    if exclude_content_id is not None:
+        stmt = stmt.where(PdfContent.id != exclude_content_id)
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+
+def content_paths(file_path):
+    """The stored PDF, every chunk file written for it, and its index dir."""
+    stem = Path(file_path).stem
+    return (
+        file_path,
+        [*store_paths(stem), legacy_pickle_path(stem), lexical_index_path(stem)],
+        os.path.join(COLBERT_INDEXES_DIR, f"{stem}_index"),
+    )
+
+
+def remove_content_files(file_path):
+    pdf_path, chunk_paths, index_path = content_paths(file_path)
+    for path in (pdf_path, *chunk_paths):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(index_path, ignore_errors=True)
+    chunk_filename = os.path.basename(chunk_paths[0])
+    retriever_cache.invalidate(chunk_filename)
+    answer_cache.invalidate(chunk_filename)
+
+
+async def release_user_file(db, user_file):
+    """
+    Delete a user's file entry and drop one reference to its content,
+    removing the stored PDF, chunks and index once nobody refers to it.
+    """
+    content = await db.get(PdfContent, user_file.content_id) if user_file.content_id else None
+    await db.delete(user_file)
+    await db.flush()
+
+    if content is not None and await _add_reference(db, content, -1) is not None:
+        if content.ref_count <= 0 and content.status != CONTENT_PENDING:
+            # Trust the rows, not the counter, before deleting shared files
+            remaining = (await db.execute(
+                select(func.count(UserFile.id)).where(UserFile.content_id == content.id)
+            )).scalar_one()
+            if remaining:
+                logging.warning(f"Content {content.id} still has {remaining} file(s); repairing its ref_count")
+                await _add_reference(db, content, remaining - content.ref_count)
+            else:
+                # Only if no upload attached to it in the meantime
+                result = await db.execute(
+                    delete(PdfContent)
+                    .where(PdfContent.id == content.id, PdfContent.ref_count <= 0)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount:
+                    file_path = content.file_path
+                    await db.commit()
+                    remove_content_files(file_path)
+                    logging.info(f"Removed unreferenced content {file_path}")
+                    return
+    await db.commit()
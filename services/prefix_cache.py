@@ -0,0 +1,184 @@
+# services/prefix_cache.py
+
+import time, logging, threading
+
+from configs.settings import PREFIX_CACHE_CONTEXTS
+
+
+class _Context:
+    """A model instance plus the tokens currently held in its KV cache."""
+
+    def __init__(self, model):
+        self.model = model
+        self.tokens = []
+        self.owner = None
+        self.last_used = time.monotonic()
+        self.evaluated = 0  # tokens evaluated by the last `prepare`
+
+
+def _common_prefix_len(resident, tokens):
+    """Number of leading tokens `resident` and `tokens` share."""
+    n = min(len(resident), len(tokens))
+    i = 0
+    while i < n and resident[i] == tokens[i]:
+        i += 1
+    return i
+
+
+class PrefixCache:
+    """
+    Keeps KV state for recently evaluated token sequences so prompt
+    evaluation only pays for tokens that haven't been seen.
+
+    A new sequence goes to the context sharing the longest token prefix
+    with it (typically the prompt template's header, or an earlier turn of
+    the same chat); ctransformers rolls that context back to the shared
+    prefix and only the rest is evaluated. The cache holds up to `size`
+    contexts (the primary model plus CPU instances created on demand by
+    `context_factory`, which share the mmapped weights).
+
+    A context assigned to a sequence that is still running or waiting to
+    resume is pinned: it is never matched against or handed to another
+    sequence, so a preempted sequence always resumes without
+    re-evaluating. Only free contexts are recycled, least recently used
+    first.
+
+    Only the scheduler's decode thread calls `prepare`, so no locking is
+    needed on the contexts themselves.
+    """
+
+    def __init__(self, model_provider, context_factory=None, size=PREFIX_CACHE_CONTEXTS):
+        self._model_provider = model_provider
+        self._context_factory = context_factory
+        self.size = max(1, size)
+        self._primary = None
+        self._contexts = []
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.resumes = 0
+        self.reused_tokens = 0
+        self.evaluated_tokens = 0
+
+    def prepare(self, tokens, owner, resume=False):
+        """
+        Return a context whose KV cache holds exactly `tokens`, evaluating
+        only the part that isn't already resident.
+
+        `resume` marks a preempted sequence coming back for another turn.
+        Its own tokens being resident is not a shared prefix, so resumes are
+        counted separately from hits and misses.
+        """
+        self._sync_primary()
+        ctx = self._own_context(owner) or self._best_match(tokens) or self._spare_context()
+
+        if ctx.tokens == list(tokens):
+            # Resuming where it stopped; the logits for the next token are current
+            suffix = []
+        else:
+            # Rolls the context back to the shared prefix (always leaving at
+            # least one token to evaluate, for fresh logits)
+            suffix = ctx.model.prepare_inputs_for_generation(tokens, reset=True)
+            if suffix:
+                ctx.model.eval(suffix)
+        reused = len(tokens) - len(suffix)
+        ctx.tokens = list(tokens)
+        ctx.owner = owner
+        ctx.last_used = time.monotonic()
+        ctx.evaluated = len(suffix)
+
+        with self._stats_lock:
+            if resume:
+                self.resumes += 1
+            else:
+                if reused:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                self.reused_tokens += reused
+            self.evaluated_tokens += len(suffix)
+        return ctx
+
+    def holds(self, owner):
+        """Whether some context is still assigned to `owner`."""
+        return self._own_context(owner) is not None
+
+    def available_contexts(self):
+        """Contexts a sequence without one could get without displacing anybody."""
+        free = sum(1 for ctx in self._contexts if ctx.owner is None)
+        if self._context_factory is not None:
+            free += max(0, self.size - len(self._contexts))
+        return free
+
+    def release(self, owner):
+        """Unpin `owner`'s context; its KV state stays cached for reuse."""
+        for ctx in self._contexts:
+            if ctx.owner is owner:
+                ctx.owner = None
+
+    def discard(self, owner):
+        """Forget the state of `owner`'s context, e.g. after an error."""
+        for ctx in self._contexts:
+            if ctx.owner is owner:
+                ctx.owner = None
+                ctx.tokens = []
+                ctx.model.reset()
+
+    def stats(self):
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "contexts": len(self._contexts),
+                "max_contexts": self.size,
+                "pinned": sum(1 for ctx in self._contexts if ctx.owner is not None),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "resumes": self.resumes,
+                "reused_tokens": self.reused_tokens,
+                "evaluated_tokens": self.evaluated_tokens,
+            }
+
+    def _sync_primary(self):
+        model = self._model_provider()
+        if model is None:
+            raise RuntimeError("Model is not loaded")
+        if model is not self._primary:
+            # The model was (re)loaded; cached state from the old one is gone
+            self._primary = model
+            self._contexts = [_Context(model)]
+
+    def _own_context(self, owner):
+        for ctx in self._contexts:
+            if ctx.owner is owner:
+                return ctx
+        return None
+
+    def _best_match(self, tokens):
+        # Only free contexts: pinned ones belong to live or preempted sequences
+        best, best_len = None, 0
+        for ctx in self._contexts:
+            if ctx.owner is not None:
+                continue
+            n = _common_prefix_len(ctx.tokens, tokens)
+            if n > best_len:
+                best, best_len = ctx, n
+        return best
+
+    def _spare_context(self):
+        # Grow up to the bound first so more prefixes stay cached, then
+        # recycle the least recently used free context
+        if len(self._contexts) < self.size and self._context_factory is not None:
+            try:
+                ctx = _Context(self._context_factory())
+                self._contexts.append(ctx)
+                logging.info(f"Prefix cache grew to {len(self._contexts)} contexts")
+                return ctx
+            except Exception as e:
+                logging.error(f"Could not create another model context: {e}")
+        free = [ctx for ctx in self._contexts if ctx.owner is None]
+        if not free:
+            # The scheduler only preempts when contexts are available, so
+            # every context being pinned means its bookkeeping is off
+            raise RuntimeError("Every model context is pinned by another sequence")
+        return min(free, key=lambda ctx: ctx.last_used)
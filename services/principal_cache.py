@@ -0,0 +1,80 @@
+# services/principal_cache.py
+
+import time, threading
+from collections import OrderedDict
+
+from configs.settings import AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES
+
+
+class PrincipalCache:
+    """
+    Short-lived map of token subject (email) to user id, so authenticating a
+    request is a JWT decode plus a dict lookup instead of a database query.
+    Entries expire after `ttl_seconds`; deleting or changing a user drops
+    theirs immediately (see the User listeners in services/database.py),
+    other workers catch up within the TTL.
+    """
+
+    def __init__(self, ttl_seconds=AUTH_CACHE_TTL_SECONDS, max_entries=AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, email):
+        """The cached user id for `email`, or None."""
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[email]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(email)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, email, user_id):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[email] = (user_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email=None, user_id=None):
+        """Forget `email`, and every entry pointing at `user_id`."""
+        with self._lock:
+            stale = [
+                key for key, (uid, _) in self._entries.items()
+                if key == email or (user_id is not None and uid == user_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
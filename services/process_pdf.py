@@ -1,61 +1,258 @@
 # services/process_pdf.py
 
-import os, pickle, fitz, torch, asyncio
+import os, time, shutil, logging, asyncio
+from collections import deque
 from pathlib import Path
 
-from colbert.modeling.checkpoint import Checkpoint
-from colbert.infra.config import ColBERTConfig
-from colbert.indexer import Indexer
-
-UPLOAD_FOLDER = "/home/noyo/web2pdf/services/uploads"
-CHECKPOINT_PATH = "/home/noyo/web2pdf/models/colbertv2.0"
-DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-colbert_config = ColBERTConfig(
-    nbits=2, doc_maxlen=140, kmeans_niters=4, nway=2, gpus=1
+from configs.paths import UPLOADS_DIR, COLBERT_INDEXES_DIR, COLBERT_CHECKPOINT_PATH
+from .retriever_cache import retriever_cache
+from .answer_cache import answer_cache
+from configs.settings import (
+    EXTRACTION_WORKER_PROCESSES,
+    EXTRACTION_PAGES_PER_TASK,
+    INCREMENTAL_INDEX_MAX_DELTA,
+    RETRIEVER_BACKEND,
+)
+from .ingestion_worker import (
+    get_ingestion_pool,
+    get_extraction_pool,
+    build_index,
+    update_index,
+    page_count,
+    extract_pages,
+)
+from .resource_governor import governor
+from .chunking import SlidingWindowChunker
+from .lexical_index import build_lexical_index
+from .chunk_store import (
+    ChunkStore,
+    ChunkStoreWriter,
+    open_chunk_store,
+    store_paths,
+    chunk_filename as chunk_filename_for,
 )
-checkpoint = Checkpoint(CHECKPOINT_PATH, colbert_config=colbert_config)
+from .index_delta import (
+    chunk_hash,
+    load_hashes,
+    save_hashes,
+    plan_delta,
+    min_delta_fraction,
+    delta_fraction,
+    hashes_for_full_build,
+    hashes_after_update,
+)
+
+UPLOAD_FOLDER = UPLOADS_DIR
+CHECKPOINT_PATH = COLBERT_CHECKPOINT_PATH
 
 class PDFProcessor:
     def __init__(self, chunk_size=512, chunk_overlap=50):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.metrics = {}
+
+    async def iter_pages(self, pdf_path):
+        """
+        Yield the text of each page in order.
+
+        Page ranges are extracted in parallel by the extraction worker
+        processes (each opens the PDF itself); only a bounded number of
+        ranges is in flight so results don't pile up ahead of the consumer.
+        """
+        started = time.monotonic()
+        n_pages = await asyncio.to_thread(page_count, pdf_path)
+        step = max(1, EXTRACTION_PAGES_PER_TASK)
+        ranges = [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+
+        if len(ranges) <= 1:
+            # Not worth a round trip to another process
+            submit = lambda start, stop: asyncio.ensure_future(
+                asyncio.to_thread(extract_pages, pdf_path, start, stop)
+            )
+        else:
+            loop = asyncio.get_running_loop()
+            pool = get_extraction_pool()
+            submit = lambda start, stop: loop.run_in_executor(pool, extract_pages, pdf_path, start, stop)
+
+        window = 2 * max(1, EXTRACTION_WORKER_PROCESSES)
+        in_flight = deque()
+        try:
+            for start, stop in ranges:
+                in_flight.append(submit(start, stop))
+                if len(in_flight) >= window:
+                    for text in await in_flight.popleft():
+                        yield text
+            while in_flight:
+                for text in await in_flight.popleft():
+                    yield text
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+        elapsed = time.monotonic() - started
+        self.metrics["pages"] = n_pages
+        self.metrics["pages_per_second"] = round(n_pages / elapsed, 2) if elapsed else 0.0
 
     async def extract_text(self, pdf_path):
-        doc = await asyncio.to_thread(fitz.open, pdf_path)
-        texts = [page.get_text("text").replace("\n", " ").strip() for page in doc]
+        texts = [text async for text in self.iter_pages(pdf_path)]
         return " ".join(texts)
 
     def chunk_text(self, text):
-        words = text.split(" ")
-        chunks = []
-        i = 0
-        while i < len(words):
-            chunks.append(" ".join(words[i:i + self.chunk_size]))
-            i += self.chunk_size - self.chunk_overlap
-        return chunks
-
-    async def process_and_store(self, pdf_path):
-        text = await self.extract_text(pdf_path)
-        chunks = self.chunk_text(text)
+        chunker = SlidingWindowChunker(self.chunk_size, self.chunk_overlap)
+        chunks = chunker.feed(1, text) + chunker.close()
+        return [chunk.text for chunk in chunks]
+
+    async def iter_chunks(self, pdf_path):
+        """
+        Stream chunks (with their page span) straight from the page stream,
+        never holding more than one window of words. Identical to
+        `chunk_text(await self.extract_text(pdf_path))`.
+        """
+        chunker = SlidingWindowChunker(self.chunk_size, self.chunk_overlap)
+        page_number = 0
+        async for text in self.iter_pages(pdf_path):
+            page_number += 1
+            for chunk in chunker.feed(page_number, text):
+                yield chunk
+        for chunk in chunker.close():
+            yield chunk
+
+    async def process_and_store(self, pdf_path, progress=None, base_pdf_path=None):
+        """
+        Extract, chunk and index a PDF.
+
+        `progress` is an optional coroutine function called as
+        `await progress(stage, percent)` whenever a new stage starts.
+
+        `base_pdf_path` names an earlier version of the same document. When
+        most chunks are unchanged, its index is copied and only the
+        difference is encoded instead of indexing from scratch.
+        """
+        async def report(stage, percent):
+            if progress is not None:
+                await progress(stage, percent)
 
+        # Extraction and chunking are one streaming pass, so they are one stage
+        await report("extracting", 5)
         pdf_filename = Path(pdf_path).stem
-        chunk_filename = f"{pdf_filename}_text_chunks.pkl"
-        chunk_path = os.path.join(UPLOAD_FOLDER, chunk_filename)
+        chunk_filename = chunk_filename_for(pdf_filename)
 
-        with open(chunk_path, "wb") as f:
-            pickle.dump(chunks, f)
+        # Chunks go straight to the store as they are produced
+        new_hashes = []
+        with ChunkStoreWriter(pdf_filename, UPLOAD_FOLDER) as writer:
+            async for chunk in self.iter_chunks(pdf_path):
+                writer.add(chunk.text, chunk.first_page, chunk.last_page)
+                new_hashes.append(chunk_hash(chunk.text))
 
+        chunk_path = writer.bin_path
+
+        await report("indexing", 30)
+        if RETRIEVER_BACKEND == "lexical":
+            # Nothing to encode: the BM25 index below is all this backend needs
+            hashes = hashes_for_full_build(new_hashes)
+            self.metrics["index_mode"] = "lexical"
+        else:
+            hashes = await self._build_colbert_index(pdf_filename, chunk_path, new_hashes, base_pdf_path)
+
+        # BM25 index over the live chunks, for hybrid and lexical retrieval
+        live_pids = sorted(pid for pids in hashes.values() for pid in pids)
+        store = ChunkStore(*store_paths(pdf_filename, UPLOAD_FOLDER))
+        await asyncio.to_thread(build_lexical_index, pdf_filename, store, live_pids, UPLOAD_FOLDER)
+
+        # Any retriever or answer from the previous version of this index is stale now
+        retriever_cache.invalidate(chunk_filename)
+        answer_cache.invalidate(chunk_filename)
+
+        return chunk_filename  # ✅ So you can send this to frontend
+
+    async def _build_colbert_index(self, pdf_filename, chunk_path, new_hashes, base_pdf_path):
         # ✅ Create per-PDF index folder
-        index_path = f"/home/noyo/web2pdf/services/experiments/default/indexes/{pdf_filename}_index"
+        index_path = os.path.join(COLBERT_INDEXES_DIR, f"{pdf_filename}_index")
         os.makedirs(index_path, exist_ok=True)
 
-        indexer = Indexer(checkpoint=CHECKPOINT_PATH)
-        await asyncio.to_thread(
-            indexer.index,
-            name=index_path,
-            collection=chunks,
-            overwrite=True
+        # Index in a separate process so the chat models stay loaded here
+        await asyncio.to_thread(governor.wait_for_headroom)
+        loop = asyncio.get_running_loop()
+
+        hashes = None
+        if base_pdf_path is not None and INCREMENTAL_INDEX_MAX_DELTA > 0:
+            try:
+                hashes = await self._update_from_base(pdf_filename, index_path, chunk_path, new_hashes, base_pdf_path)
+            except Exception as e:
+                logging.error(f"Incremental indexing failed, rebuilding: {e}")
+
+        if hashes is None:
+            await loop.run_in_executor(
+                get_ingestion_pool(),
+                build_index,
+                index_path,
+                chunk_path,
+                CHECKPOINT_PATH,
+            )
+            hashes = hashes_for_full_build(new_hashes)
+            self.metrics["index_mode"] = "full"
+            self.metrics["chunks_encoded"] = len(new_hashes)
+        save_hashes(index_path, hashes)
+        return hashes
+
+    async def _update_from_base(self, pdf_filename, index_path, chunk_path, new_hashes, base_pdf_path):
+        """
+        Build this document's index from its base's by removing and adding
+        only the chunks that differ. Returns the new chunk hashes, or None
+        when a full build is the better (or only) option.
+        """
+        base_stem = Path(base_pdf_path).stem
+        base_index = os.path.join(COLBERT_INDEXES_DIR, f"{base_stem}_index")
+        if not os.path.isdir(base_index):
+            return None
+        base_store = open_chunk_store(base_stem, UPLOAD_FOLDER)
+        base_hashes = load_hashes(base_index, base_store)
+
+        # Skip planning when the chunk counts alone rule the update out
+        n_base_live = sum(len(pids) for pids in base_hashes.values())
+        bound = min_delta_fraction(n_base_live, len(new_hashes))
+        if bound > INCREMENTAL_INDEX_MAX_DELTA:
+            self.metrics["index_delta"] = round(bound, 3)
+            return None
+
+        delta = plan_delta(base_hashes, new_hashes)
+        fraction = delta_fraction(delta, len(new_hashes))
+        self.metrics["index_delta"] = round(fraction, 3)
+        if fraction > INCREMENTAL_INDEX_MAX_DELTA:
+            # Nothing has been copied yet; the full build starts from scratch
+            return None
+
+        # Work on a copy: the base index may belong to other users' uploads
+        shutil.rmtree(index_path, ignore_errors=True)
+        await asyncio.to_thread(shutil.copytree, base_index, index_path)
+
+        first_new_pid = len(base_store)
+        expected = list(range(first_new_pid, first_new_pid + len(delta.added)))
+        loop = asyncio.get_running_loop()
+        new_pids = await loop.run_in_executor(
+            get_ingestion_pool(),
+            update_index,
+            index_path,
+            chunk_path,
+            delta.added,
+            delta.removed,
+            CHECKPOINT_PATH,
         )
+        if new_pids != expected:
+            logging.warning(f"Index update assigned unexpected pids for {pdf_filename}, rebuilding")
+            return None
 
-        return chunk_filename  # ✅ So you can send this to frontend
+        # Rewrite the store in pid order: every base chunk where it was
+        # (removed ones become unreachable tombstones), then the new ones.
+        doc = ChunkStore(chunk_path, os.path.splitext(chunk_path)[0] + ".idx")
+        pages_by_pid = {pid: doc.pages(position) for position, pid in delta.reused.items()}
+        with ChunkStoreWriter(pdf_filename, UPLOAD_FOLDER) as writer:
+            for pid in range(first_new_pid):
+                writer.add(base_store[pid], *pages_by_pid.get(pid, base_store.pages(pid)))
+            for position in delta.added:
+                writer.add(doc[position], *doc.pages(position))
+
+        self.metrics["index_mode"] = "incremental"
+        self.metrics["chunks_encoded"] = len(delta.added)
+        self.metrics["chunks_removed"] = len(delta.removed)
+        return hashes_after_update(delta, new_hashes, first_new_pid)
@@ -0,0 +1,161 @@
+# services/query_encoder.py
+
+import time, threading
+from collections import OrderedDict
+
+from configs.settings import QUERY_CACHE_MAX_ENTRIES, QUERY_BATCH_WINDOW_MS, QUERY_BATCH_MAX
+
+
+class _Pending:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryEncoder:
+    """
+    Process-wide cache of ColBERT query embeddings keyed by query text.
+
+    Every index is built with the same checkpoint, so an embedding computed
+    for one retriever is valid for all of them. Misses are encoded in
+    batches: the first thread to miss becomes the leader, optionally waits
+    `batch_window_ms` for company, and encodes every queued query in one
+    forward pass while the others wait for their row. Concurrent requests
+    for the same text share a single encode. A leader stops once its own
+    query is answered and hands the rest of the queue to a waiting thread,
+    so no caller encodes batches on behalf of later arrivals indefinitely.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES,
+                 batch_window_ms=QUERY_BATCH_WINDOW_MS, max_batch=QUERY_BATCH_MAX):
+        self.max_entries = max_entries
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._queue = []
+        self._leading = False
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        self.seconds_saved = 0.0
+
+    def encode(self, query_text, encode_fn):
+        """
+        Embeddings for `query_text`, shaped like `encode_fn(query_text)`.
+        `encode_fn` is a Searcher's `encode`, which also accepts a list.
+        """
+        with self._lock:
+            Q = self._cache.get(query_text)
+            if Q is not None:
+                self._cache.move_to_end(query_text)
+                self.hits += 1
+                self.seconds_saved += self._mean_encode_seconds()
+                return Q
+            self.misses += 1
+            pending = self._inflight.get(query_text)
+            if pending is None:
+                pending = self._inflight[query_text] = _Pending()
+                self._queue.append(query_text)
+            lead = not self._leading
+            if lead:
+                self._leading = True
+
+        if lead:
+            self._lead(encode_fn, pending, wait_for_company=True)
+        while not pending.event.is_set():
+            with self._lock:
+                while self._leading and not pending.event.is_set():
+                    self._cond.wait()
+                lead = not pending.event.is_set()
+                if lead:
+                    self._leading = True
+            if lead:
+                # Take over from a leader that finished its own query
+                self._lead(encode_fn, pending, wait_for_company=False)
+        if pending.error is not None:
+            raise pending.error
+        return pending.value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._cache),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "batches": self.batches,
+                "mean_batch_size": round(self.encoded / self.batches, 2) if self.batches else 0.0,
+                "encode_seconds": round(self.encode_seconds, 3),
+                "encode_seconds_saved": round(self.seconds_saved, 3),
+            }
+
+    def _mean_encode_seconds(self):
+        return self.encode_seconds / self.encoded if self.encoded else 0.0
+
+    def _lead(self, encode_fn, own, wait_for_company):
+        try:
+            if wait_for_company and self.batch_window > 0:
+                time.sleep(self.batch_window)
+            while not own.event.is_set():
+                if not self._encode_batch(encode_fn):
+                    break
+        finally:
+            with self._lock:
+                self._leading = False
+                self._cond.notify_all()
+
+    def _encode_batch(self, encode_fn):
+        with self._lock:
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            if not batch:
+                return False
+            pendings = [self._inflight[text] for text in batch]
+
+        started = time.perf_counter()
+        try:
+            Q = encode_fn(batch)
+            error = None
+        except Exception as e:
+            Q, error = None, e
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            for i, (text, pending) in enumerate(zip(batch, pendings)):
+                del self._inflight[text]
+                if error is not None:
+                    pending.error = error
+                    continue
+                pending.value = Q[i:i + 1]
+                self._store_locked(text, pending.value)
+            if error is None:
+                self.batches += 1
+                self.encoded += len(batch)
+                self.encode_seconds += elapsed
+            for pending in pendings:
+                pending.event.set()
+            self._cond.notify_all()
+        return True
+
+    def _store_locked(self, text, Q):
+        self._cache[text] = Q
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+query_encoder = QueryEncoder()
@@ -0,0 +1,75 @@
+# services/resource_governor.py
+
+import time, logging, threading
+
+from configs.settings import (
+    GOVERNOR_MIN_AVAILABLE_MB,
+    GOVERNOR_MAX_WAIT_SECONDS,
+    GOVERNOR_POLL_SECONDS,
+)
+
+
+def available_memory_mb():
+    """MemAvailable from /proc/meminfo, or None when it can't be read."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+class ResourceGovernor:
+    """
+    Delays work only while the machine is actually short on memory.
+
+    Callers ask `wait_for_headroom()` before starting something memory
+    hungry; it returns immediately unless available memory is below the
+    configured floor, in which case it waits (up to `max_wait_seconds`)
+    for memory to be released.
+    """
+
+    def __init__(self, min_available_mb=GOVERNOR_MIN_AVAILABLE_MB,
+                 max_wait_seconds=GOVERNOR_MAX_WAIT_SECONDS,
+                 poll_seconds=GOVERNOR_POLL_SECONDS):
+        self.min_available_mb = min_available_mb
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+
+    def is_constrained(self):
+        available = available_memory_mb()
+        return available is not None and available < self.min_available_mb
+
+    def wait_for_headroom(self):
+        """Block while memory is constrained; returns the seconds waited."""
+        if not self.is_constrained():
+            return 0.0
+
+        started = time.monotonic()
+        deadline = started + self.max_wait_seconds
+        while self.is_constrained() and time.monotonic() < deadline:
+            time.sleep(self.poll_seconds)
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self.throttled += 1
+            self.throttled_seconds += waited
+        logging.warning(f"Memory constrained, throttled work for {waited:.2f}s")
+        return waited
+
+    def stats(self):
+        with self._lock:
+            return {
+                "available_mb": available_memory_mb(),
+                "min_available_mb": self.min_available_mb,
+                "throttled": self.throttled,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+
+
+governor = ResourceGovernor()
@@ -0,0 +1,179 @@
+# services/retriever_cache.py
+
+import os, time, logging, threading
+from collections import OrderedDict
+
+from configs.settings import (
+    RETRIEVER_CACHE_MAX_ENTRIES,
+    RETRIEVER_CACHE_MAX_BYTES,
+    RETRIEVER_CACHE_TTL_SECONDS,
+)
+from .chunk_store import chunk_stem
+from .retrievers import load_retriever
+
+
+def _disk_size(path):
+    """Size in bytes of a file or of every file below a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class _Entry:
+    __slots__ = ("retriever", "nbytes", "last_used")
+
+    def __init__(self, retriever, nbytes):
+        self.retriever = retriever
+        self.nbytes = nbytes
+        self.last_used = time.monotonic()
+
+
+class RetrieverCache:
+    """
+    Process-wide registry of loaded retrievers keyed by document stem.
+
+    Loading a retriever opens the chunk store and builds its search index
+    (a ColBERT Searcher, or the BM25 postings), so we keep recently used
+    ones around. Entries are evicted
+    least-recently-used first whenever the entry count or the estimated
+    memory budget is exceeded, and dropped once idle for longer than the TTL.
+    """
+
+    def __init__(self, max_entries=RETRIEVER_CACHE_MAX_ENTRIES,
+                 max_bytes=RETRIEVER_CACHE_MAX_BYTES,
+                 ttl_seconds=RETRIEVER_CACHE_TTL_SECONDS,
+                 loader=load_retriever):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._loader = loader
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        # Bumped by invalidate() (per key) and clear() (all keys), so a load
+        # that was already running when its document changed isn't cached
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, chunk_filename):
+        if not chunk_filename:
+            raise ValueError("Chunk filename is required in PDF mode")
+        key = chunk_stem(chunk_filename)
+
+        with self._lock:
+            self._expire_locked()
+            entry = self._lookup_locked(key)
+            if entry is not None:
+                return entry.retriever
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given document; the others wait and reuse it.
+        with key_lock:
+            with self._lock:
+                entry = self._lookup_locked(key)
+                if entry is not None:
+                    return entry.retriever
+                self.misses += 1
+                generation = self._generation_locked(key)
+
+            try:
+                retriever = self._loader(chunk_filename)
+                nbytes = _disk_size(retriever.chunk_path) + _disk_size(retriever.index_path)
+                with self._lock:
+                    if self._generation_locked(key) == generation:
+                        self._store_locked(key, _Entry(retriever, nbytes))
+                    else:
+                        logging.debug(f"Retriever for {key} changed while loading; not caching it")
+            finally:
+                with self._lock:
+                    if self._key_locks.get(key) is key_lock:
+                        del self._key_locks[key]
+            return retriever
+
+    def invalidate(self, chunk_filename):
+        """Drop the cached retriever for a document, e.g. after re-indexing."""
+        key = chunk_stem(chunk_filename)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+                self.invalidations += 1
+                logging.debug(f"Retriever cache invalidated: {key}")
+            return entry is not None
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _generation_locked(self, key):
+        return self._epoch, self._generations.get(key, 0)
+
+    def _lookup_locked(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry.last_used = time.monotonic()
+        self.hits += 1
+        return entry
+
+    def _store_locked(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        # Never evict the entry we just loaded, even if it alone is over budget.
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            self._evict_oldest_locked()
+
+    def _expire_locked(self):
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._entries:
+            oldest = next(iter(self._entries.values()))
+            if oldest.last_used >= cutoff:
+                break
+            self._evict_oldest_locked()
+
+    def _evict_oldest_locked(self):
+        key, entry = self._entries.popitem(last=False)
+        self._bytes -= entry.nbytes
+        self.evictions += 1
+        logging.debug(f"Retriever cache evicted: {key}")
+
+
+retriever_cache = RetrieverCache()
@@ -0,0 +1,86 @@
+# services/retrievers.py
+#
+# Retriever backends. Every retriever is built from a chunk filename and
+# offers the same interface:
+#
+#   kind                                 backend name; scores are comparable within a kind
+#   text_chunks                          chunk store, indexable by doc id
+#   chunk_path, index_path               files backing it (for cache sizing)
+#   encode(query_text)                   query representation for search_encoded
+#   search_encoded(Q, top_k, query_text) [(doc_id, chunk, score)], best first
+#   search_with_ids(query_text, top_k)   [(doc_id, chunk)], deduplicated
+#   search(query_text, top_k)            [chunk]
+#
+# "colbert" needs the ColBERT checkpoint and a per-document index;
+# "lexical" only needs the BM25 index written next to the chunk store, so
+# retrieval starts instantly and never loads ColBERT. (The chat model and
+# summarizer are separate and still need ctransformers and torch.)
+
+import logging
+
+from configs.paths import UPLOADS_DIR
+from configs.settings import RETRIEVER_BACKEND
+from .chunk_store import open_chunk_store, chunk_stem
+from .lexical_index import LexicalIndex, lexical_index_path
+
+
+class LexicalRetriever:
+    kind = "lexical"
+
+    def __init__(self, chunk_filename):
+        if not chunk_filename:
+            raise ValueError("Chunk filename is required in PDF mode")
+
+        stem = chunk_stem(chunk_filename)
+        self.text_chunks = open_chunk_store(stem, UPLOADS_DIR)
+        self.lexical = LexicalIndex.open(stem, UPLOADS_DIR)
+        if self.lexical is None:
+            raise FileNotFoundError(f"Lexical index not found: {lexical_index_path(stem)}")
+        self.chunk_path = self.text_chunks.path
+        self.index_path = self.lexical.path
+
+    def encode(self, query_text):
+        # Nothing to precompute; the query text is the representation
+        return query_text
+
+    def search_encoded(self, Q, top_k=5, query_text=None):
+        return [
+            (pid, self.text_chunks[pid], score)
+            for pid, score in self.lexical.search(query_text if query_text is not None else Q, top_k)
+        ]
+
+    def search(self, query_text, top_k=5):
+        return [chunk for _, chunk in self.search_with_ids(query_text, top_k)]
+
+    def search_with_ids(self, query_text, top_k=5):
+        retrieved, seen_chunks = [], set()
+        for doc_id, chunk, _ in self.search_encoded(query_text, top_k):
+            if chunk not in seen_chunks:
+                seen_chunks.add(chunk)
+                retrieved.append((doc_id, chunk))
+        return retrieved
+
+
+def load_retriever(chunk_filename, backend=None):
+    """
+    Build the configured retriever for a document. With the ColBERT
+    backend, a document whose ColBERT index is missing is served
+    lexically if it has a BM25 index, instead of failing outright.
+    """
+    backend = backend or RETRIEVER_BACKEND
+    if backend == "lexical":
+        return LexicalRetriever(chunk_filename)
+    if backend != "colbert":
+        raise ValueError(f"Unknown retriever backend: {backend}")
+
+    # Imported here so the lexical backend never loads ColBERT/torch
+    from .colbert_retriever import ColBERTRetriever
+    try:
+        return ColBERTRetriever(chunk_filename)
+    except FileNotFoundError as e:
+        try:
+            retriever = LexicalRetriever(chunk_filename)
+        except FileNotFoundError:
+            raise e
+        logging.warning(f"{e}; falling back to lexical retrieval")
+        return retriever
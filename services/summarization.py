@@ -1,14 +1,24 @@
 import logging
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+from configs.settings import SUMMARIZER_BATCH_SIZE, SUMMARIZER_TORCH_THREADS
 
 class TextSummarizer:
-    def __init__(self, model_name="sshleifer/distilbart-cnn-12-6", max_tokens=512, min_length=60, max_length=200):
+    def __init__(self, model_name="sshleifer/distilbart-cnn-12-6", max_tokens=512, min_length=60, max_length=200,
+                 batch_size=SUMMARIZER_BATCH_SIZE, num_threads=SUMMARIZER_TORCH_THREADS):
+        # The model stack is imported here so the app starts without it
+        import torch
+        from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+        self.model.eval()
         self.summarizer = pipeline("summarization", model=self.model, tokenizer=self.tokenizer)
         self.max_tokens = max_tokens
         self.min_length = min_length
         self.max_length = max_length
+        self.batch_size = max(1, batch_size)
 
     def _chunk_text_by_tokens(self, text):
         tokens = self.tokenizer.encode(text, truncation=False)
@@ -22,22 +32,38 @@ class TextSummarizer:
         logging.debug(f"Token-based chunk count: {len(chunks)}")
         return chunks
 
-    def summarize_large_text(self, text):
+    def summarize_large_text(self, text, should_stop=None):
+        """
+        Summary of `text`, or None if `should_stop()` turned true between
+        batches (the request timed out or was cancelled).
+        """
         chunks = self._chunk_text_by_tokens(text)
-        summaries = []
-
-        for chunk in chunks:
-            summary = self.summarizer(
-                chunk,
-                max_length=self.max_length,
-                min_length=self.min_length,
-                do_sample=False
-            )[0]['summary_text']
-            summaries.append(summary)
+        summaries = self._summarize_chunks(chunks, should_stop)
+        if summaries is None:
+            return None
 
         clean_summary = self._remove_redundancy(" ".join(summaries))
         return self._format_academic_answer(clean_summary)
 
+    def _summarize_chunks(self, chunks, should_stop=None):
+        import torch
+
+        summaries = []
+        # One padded forward pass per batch instead of one generate() per chunk
+        with torch.inference_mode():
+            for start in range(0, len(chunks), self.batch_size):
+                if should_stop is not None and should_stop():
+                    return None
+                results = self.summarizer(
+                    chunks[start:start + self.batch_size],
+                    max_length=self.max_length,
+                    min_length=self.min_length,
+                    do_sample=False,
+                    batch_size=self.batch_size
+                )
+                summaries.extend(result['summary_text'] for result in results)
+        return summaries
+
     def _remove_redundancy(self, text):
         sentences = list(dict.fromkeys(text.split(". ")))  # removes exact repeated sentences
         return ". ".join(sentences)
@@ -0,0 +1,206 @@
+# services/user_index.py
+#
+# Optional consolidated index over all of a user's ready PDFs, so searching
+# "all my documents" is a single ColBERT search instead of one per PDF. It
+# is rebuilt in the background whenever the user's set of documents changes
+# and only used while it covers exactly the documents being searched.
+
+import os, json, shutil, asyncio, bisect, logging, threading
+
+from sqlalchemy.future import select
+
+from configs.paths import UPLOADS_DIR, COLBERT_INDEXES_DIR, COLBERT_CHECKPOINT_PATH
+from configs.settings import USER_INDEX_ENABLED, USER_INDEX_MIN_DOCUMENTS, RETRIEVER_BACKEND
+from .database import AsyncSessionLocal, PdfContent, UserFile
+from .chunk_store import ChunkStore, ChunkStoreWriter, open_chunk_store, chunk_stem, store_paths
+from .index_delta import load_hashes
+from .lexical_index import build_lexical_index, lexical_index_path
+from .ingestion_worker import get_ingestion_pool, build_index
+from .resource_governor import governor
+from .retriever_cache import retriever_cache
+from .pdf_contents import CONTENT_READY
+
+
+def _stem(user_id):
+    return f"user_{user_id}"
+
+
+def _manifest_path(stem):
+    return os.path.join(UPLOADS_DIR, f"{stem}_sources.json")
+
+
+def _index_path(stem):
+    return os.path.join(COLBERT_INDEXES_DIR, f"{stem}_index")
+
+
+class ConsolidatedIndex:
+    """A user's consolidated retriever plus the map back to source documents."""
+
+    def __init__(self, retriever, manifest):
+        self.retriever = retriever
+        self.sources = [source["chunk_filename"] for source in manifest["sources"]]
+        self._doc_ids = [source["doc_ids"] for source in manifest["sources"]]
+        self._offsets = []
+        total = 0
+        for doc_ids in self._doc_ids:
+            self._offsets.append(total)
+            total += len(doc_ids)
+
+    def resolve(self, pid):
+        """(chunk_filename, doc_id) a consolidated pid came from."""
+        i = bisect.bisect_right(self._offsets, pid) - 1
+        return self.sources[i], self._doc_ids[i][pid - self._offsets[i]]
+
+
+def _write_store(stem, chunk_filenames):
+    """Concatenate the live chunks of every source into one store."""
+    sources = []
+    with ChunkStoreWriter(stem, UPLOADS_DIR) as writer:
+        for name in chunk_filenames:
+            source_stem = chunk_stem(name)
+            store = open_chunk_store(source_stem, UPLOADS_DIR)
+            hashes = load_hashes(os.path.join(COLBERT_INDEXES_DIR, f"{source_stem}_index"), store)
+            doc_ids = sorted(pid for pids in hashes.values() for pid in pids)
+            for pid in doc_ids:
+                writer.add(store[pid], *store.pages(pid))
+            sources.append({"chunk_filename": name, "doc_ids": doc_ids})
+    consolidated = ChunkStore(*store_paths(stem, UPLOADS_DIR))
+    build_lexical_index(stem, consolidated, range(len(consolidated)), UPLOADS_DIR)
+    return writer.bin_path, {"sources": sources}
+
+
+def _remove(stem):
+    for path in (_manifest_path(stem), *store_paths(stem, UPLOADS_DIR), lexical_index_path(stem)):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(_index_path(stem), ignore_errors=True)
+
+
+class UserIndexes:
+    def __init__(self, enabled=USER_INDEX_ENABLED, min_documents=USER_INDEX_MIN_DOCUMENTS):
+        self.enabled = enabled
+        self.min_documents = min_documents
+        self._tasks = {}
+        self._dirty = set()
+        self._manifests = {}
+        # Per user: held while pairing the manifest with the cached retriever
+        # and while swapping files, so a search never combines generations
+        self._swap_locks = {}
+        self.rebuilds = 0
+
+    def schedule_rebuild(self, user_id):
+        """Rebuild a user's index soon; repeated calls while one runs coalesce."""
+        if not self.enabled:
+            return
+        task = self._tasks.get(user_id)
+        if task is not None and not task.done():
+            self._dirty.add(user_id)
+            return
+        self._tasks[user_id] = asyncio.create_task(self._rebuild_loop(user_id))
+
+    def lookup(self, user_id, chunk_filenames):
+        """The user's consolidated index if it covers exactly these documents."""
+        if not self.enabled or user_id is None:
+            return None
+        stem = _stem(user_id)
+        with self._swap_lock(stem):
+            manifest = self._load_manifest(stem)
+            if manifest is None:
+                return None
+            wanted = {chunk_stem(name) for name in chunk_filenames}
+            if wanted != {chunk_stem(s["chunk_filename"]) for s in manifest["sources"]}:
+                return None
+            return ConsolidatedIndex(retriever_cache.get(stem), manifest)
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "rebuilding": sum(1 for task in self._tasks.values() if not task.done()),
+            "rebuilds": self.rebuilds,
+        }
+
+    def _swap_lock(self, stem):
+        return self._swap_locks.setdefault(stem, threading.Lock())
+
+    def _load_manifest(self, stem):
+        path = _manifest_path(stem)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._manifests.get(stem)
+        if cached is None or cached[0] != mtime:
+            with open(path) as f:
+                cached = (mtime, json.load(f))
+            self._manifests[stem] = cached
+        return cached[1]
+
+    async def _rebuild_loop(self, user_id):
+        while True:
+            self._dirty.discard(user_id)
+            try:
+                await self._rebuild(user_id)
+            except Exception:
+                logging.exception(f"Rebuilding the consolidated index of user {user_id} failed")
+            if user_id not in self._dirty:
+                break
+
+    async def _rebuild(self, user_id):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(PdfContent.chunk_filename)
+                .join(UserFile, UserFile.content_id == PdfContent.id)
+                .where(UserFile.user_id == user_id, PdfContent.status == CONTENT_READY)
+                .distinct()
+            )
+            chunk_filenames = sorted(name for name in result.scalars().all() if name)
+
+        stem = _stem(user_id)
+        if len(chunk_filenames) < self.min_documents:
+            await asyncio.to_thread(self._drop, stem)
+            return
+
+        # Build under a scratch name and swap in, so searches never see a
+        # store and index from different generations.
+        next_stem = f"{stem}_next"
+        chunk_path, manifest = await asyncio.to_thread(_write_store, next_stem, chunk_filenames)
+        next_index = _index_path(next_stem)
+        shutil.rmtree(next_index, ignore_errors=True)
+        os.makedirs(next_index, exist_ok=True)
+
+        if RETRIEVER_BACKEND == "colbert":
+            await asyncio.to_thread(governor.wait_for_headroom)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                get_ingestion_pool(), build_index, next_index, chunk_path, COLBERT_CHECKPOINT_PATH
+            )
+
+        await asyncio.to_thread(self._swap, stem, next_stem, manifest)
+        self.rebuilds += 1
+        logging.info(f"Rebuilt consolidated index for user {user_id} ({len(chunk_filenames)} documents)")
+
+    def _drop(self, stem):
+        with self._swap_lock(stem):
+            _remove(stem)
+            retriever_cache.invalidate(stem)
+
+    def _swap(self, stem, next_stem, manifest):
+        # Under the lock, no lookup can pair the new manifest with a
+        # retriever over the old files (or the reverse)
+        with self._swap_lock(stem):
+            if os.path.exists(_manifest_path(stem)):
+                os.remove(_manifest_path(stem))
+            next_files = (*store_paths(next_stem, UPLOADS_DIR), lexical_index_path(next_stem))
+            files = (*store_paths(stem, UPLOADS_DIR), lexical_index_path(stem))
+            for src, dst in zip(next_files, files):
+                os.replace(src, dst)
+            shutil.rmtree(_index_path(stem), ignore_errors=True)
+            os.replace(_index_path(next_stem), _index_path(stem))
+            retriever_cache.invalidate(stem)
+            tmp = _manifest_path(stem) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, _manifest_path(stem))
+
+
+user_indexes = UserIndexes()
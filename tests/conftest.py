@@ -0,0 +1,12 @@
+# tests/conftest.py
+
+import os, sys
+
+# Import the app's packages (services, api, configs) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests never need a Postgres server: an in-memory SQLite database, and
+# cheap bcrypt so signing up and logging in stays fast
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
+os.environ.setdefault("WARMUP_MODELS", "")
@@ -0,0 +1,132 @@
+# tests/test_chunk_store.py
+#
+# The memory-mapped chunk store's on-disk format, and the migration of
+# legacy pickled chunk lists into it.
+
+import os, pickle, struct
+from array import array
+
+import pytest
+
+from services.chunk_store import (
+    MAGIC, ChunkStore, ChunkStoreWriter, PickledChunks, open_chunk_store, store_paths,
+)
+from scripts import migrate_chunk_pickles
+
+
+CHUNKS = ["first chunk", "", "naïve café — ünïcode ✓", "last one"]
+PAGES = [(1, 1), (1, 2), (2, 2), (3, 4)]
+
+
+def write_store(directory, stem="doc", chunks=CHUNKS, pages=PAGES):
+    with ChunkStoreWriter(stem, str(directory)) as writer:
+        for text, (first, last) in zip(chunks, pages):
+            writer.add(text, first, last)
+    return store_paths(stem, str(directory))
+
+
+def test_files_follow_the_documented_layout(tmp_path):
+    bin_path, idx_path = write_store(tmp_path)
+
+    with open(bin_path, "rb") as f:
+        assert f.read() == "".join(CHUNKS).encode("utf-8")
+
+    with open(idx_path, "rb") as f:
+        idx = f.read()
+    n = len(CHUNKS)
+    magic, count = struct.unpack_from("=8sQ", idx, 0)
+    assert (magic, count) == (MAGIC, n)
+
+    offsets = array("Q")
+    offsets.frombytes(idx[16:16 + 8 * (n + 1)])
+    sizes = [len(text.encode("utf-8")) for text in CHUNKS]
+    assert list(offsets) == [sum(sizes[:i]) for i in range(n + 1)]
+
+    pages = array("I")
+    pages.frombytes(idx[16 + 8 * (n + 1):])
+    assert list(pages) == [first for first, _ in PAGES] + [last for _, last in PAGES]
+
+
+def test_store_reads_back_chunks_and_pages(tmp_path):
+    store = ChunkStore(*write_store(tmp_path))
+
+    assert len(store) == len(CHUNKS)
+    assert list(store) == CHUNKS
+    assert store[-1] == CHUNKS[-1]
+    assert [store.pages(i) for i in range(len(store))] == PAGES
+    with pytest.raises(IndexError):
+        store[len(CHUNKS)]
+
+
+def test_empty_store(tmp_path):
+    store = ChunkStore(*write_store(tmp_path, chunks=[], pages=[]))
+    assert len(store) == 0
+    assert list(store) == []
+
+
+def test_rejects_an_index_without_the_magic(tmp_path):
+    bin_path, idx_path = write_store(tmp_path)
+    with open(idx_path, "r+b") as f:
+        f.write(b"NOTCHUNK")
+    with pytest.raises(ValueError):
+        ChunkStore(bin_path, idx_path)
+
+
+def test_failed_write_publishes_nothing(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ChunkStoreWriter("doc", str(tmp_path)) as writer:
+            writer.add("partial", 1, 1)
+            raise RuntimeError("extraction failed")
+    assert os.listdir(tmp_path) == []
+
+
+def test_open_chunk_store_falls_back_to_a_pickle(tmp_path):
+    with open(tmp_path / "doc_text_chunks.pkl", "wb") as f:
+        pickle.dump(CHUNKS, f)
+    store = open_chunk_store("doc", str(tmp_path))
+    assert isinstance(store, PickledChunks)
+    assert list(store) == CHUNKS
+
+    write_store(tmp_path)
+    assert isinstance(open_chunk_store("doc", str(tmp_path)), ChunkStore)
+
+    with pytest.raises(FileNotFoundError):
+        open_chunk_store("missing", str(tmp_path))
+
+
+@pytest.mark.parametrize("with_pages", [True, False])
+def test_migration_round_trip(tmp_path, monkeypatch, with_pages):
+    monkeypatch.setattr(migrate_chunk_pickles, "UPLOADS_DIR", str(tmp_path))
+    pkl_path = tmp_path / "doc_text_chunks.pkl"
+    pages_path = tmp_path / "doc_chunk_pages.pkl"
+    with open(pkl_path, "wb") as f:
+        pickle.dump(CHUNKS, f)
+    if with_pages:
+        with open(pages_path, "wb") as f:
+            pickle.dump(PAGES, f)
+
+    assert migrate_chunk_pickles.migrate(str(pkl_path)) == len(CHUNKS)
+
+    store = open_chunk_store("doc", str(tmp_path))
+    assert isinstance(store, ChunkStore)
+    assert list(store) == CHUNKS
+    expected_pages = PAGES if with_pages else [(0, 0)] * len(CHUNKS)
+    assert [store.pages(i) for i in range(len(store))] == expected_pages
+    # The originals stay unless asked otherwise
+    assert pkl_path.exists()
+
+
+def test_migration_deletes_the_pickles_when_asked(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrate_chunk_pickles, "UPLOADS_DIR", str(tmp_path))
+    pkl_path = tmp_path / "doc_text_chunks.pkl"
+    pages_path = tmp_path / "doc_chunk_pages.pkl"
+    with open(pkl_path, "wb") as f:
+        pickle.dump(CHUNKS, f)
+    with open(pages_path, "wb") as f:
+        pickle.dump(PAGES, f)
+
+    migrate_chunk_pickles.migrate(str(pkl_path), delete=True)
+
+    assert not pkl_path.exists()
+    assert not pages_path.exists()
+    assert list(open_chunk_store("doc", str(tmp_path))) == CHUNKS
@@ -0,0 +1,84 @@
+# tests/test_chunking.py
+#
+# SlidingWindowChunker must produce exactly the chunks of the original
+# whole-document chunker, reproduced here as the reference.
+
+import random
+
+import pytest
+
+from services.chunking import SlidingWindowChunker
+
+
+def reference_chunks(pages, chunk_size, chunk_overlap):
+    # PDFProcessor.extract_text + chunk_text before chunking was streamed
+    words = " ".join(pages).split(" ")
+    chunks = []
+    i = 0
+    while i < len(words):
+        chunks.append(" ".join(words[i:i + chunk_size]))
+        i += chunk_size - chunk_overlap
+    return chunks
+
+
+def streamed_chunks(pages, chunk_size, chunk_overlap):
+    chunker = SlidingWindowChunker(chunk_size, chunk_overlap)
+    chunks = []
+    for page_number, text in enumerate(pages, start=1):
+        chunks.extend(chunker.feed(page_number, text))
+    chunks.extend(chunker.close())
+    return chunks
+
+
+def words(n, prefix="w"):
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+CASES = {
+    "no pages": [],
+    "empty page": [""],
+    "empty pages": ["", "", ""],
+    "fewer words than the window": [words(10)],
+    "exactly one window": [words(512)],
+    "one word over a window": [words(513)],
+    "exact multiple of the stride": [words(462 * 3)],
+    "stride multiple plus overlap": [words(462 * 3 + 50)],
+    "window split across page breaks": [words(300, "a"), words(300, "b"), words(300, "c")],
+    "empty pages between text": [words(200, "a"), "", words(400, "b"), ""],
+    "runs of spaces": ["a  b   c", "  ", " d e "],
+}
+
+
+@pytest.mark.parametrize("pages", CASES.values(), ids=CASES.keys())
+@pytest.mark.parametrize("chunk_size, chunk_overlap", [(512, 50), (5, 2), (3, 0), (2, 1)])
+def test_matches_reference(pages, chunk_size, chunk_overlap):
+    chunks = streamed_chunks(pages, chunk_size, chunk_overlap)
+    assert [chunk.text for chunk in chunks] == reference_chunks(pages, chunk_size, chunk_overlap)
+
+
+def test_matches_reference_on_random_pages():
+    rng = random.Random(0)
+    vocabulary = ["alpha", "beta", "", "gamma", "δέλτα", "x"]
+    for _ in range(500):
+        pages = [
+            " ".join(rng.choice(vocabulary) for _ in range(rng.randrange(0, 40)))
+            for _ in range(rng.randrange(0, 8))
+        ]
+        chunk_size = rng.randrange(1, 20)
+        chunk_overlap = rng.randrange(0, chunk_size)
+        chunks = streamed_chunks(pages, chunk_size, chunk_overlap)
+        assert [chunk.text for chunk in chunks] == reference_chunks(pages, chunk_size, chunk_overlap)
+
+
+def test_page_spans():
+    chunks = streamed_chunks(["a b c", "d e f", "g h i"], chunk_size=4, chunk_overlap=1)
+    assert [(c.text, c.first_page, c.last_page) for c in chunks] == [
+        ("a b c d", 1, 2),
+        ("d e f g", 2, 3),
+        ("g h i", 3, 3),
+    ]
+
+
+def test_overlap_must_be_smaller_than_window():
+    with pytest.raises(ValueError):
+        SlidingWindowChunker(chunk_size=5, chunk_overlap=5)
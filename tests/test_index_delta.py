@@ -0,0 +1,106 @@
+# tests/test_index_delta.py
+#
+# Planning an incremental index update, and the pid layout it leaves behind:
+# base chunks keep their pids, new chunks are appended after the base store.
+
+from services.index_delta import (
+    chunk_hash, delta_fraction, hashes_after_update, hashes_for_full_build,
+    load_hashes, min_delta_fraction, plan_delta, save_hashes,
+)
+
+
+def hashes_of(texts):
+    return [chunk_hash(text) for text in texts]
+
+
+def live_layout(hashes, store):
+    """{pid: chunk text} for every live pid, to compare against a full build."""
+    return {pid: store[pid] for pids in hashes.values() for pid in pids}
+
+
+def test_unchanged_document_reuses_everything():
+    texts = ["a", "b", "c"]
+    delta = plan_delta(hashes_for_full_build(hashes_of(texts)), hashes_of(texts))
+    assert delta.reused == {0: 0, 1: 1, 2: 2}
+    assert delta.added == []
+    assert delta.removed == []
+    assert delta_fraction(delta, len(texts)) == 0
+
+
+def test_changed_chunks_are_added_and_removed():
+    base = hashes_for_full_build(hashes_of(["a", "b", "c", "d"]))
+    new = hashes_of(["a", "B", "c", "e", "f"])
+    delta = plan_delta(base, new)
+    assert delta.reused == {0: 0, 2: 2}
+    assert delta.added == [1, 3, 4]
+    assert delta.removed == [1, 3]
+    assert delta_fraction(delta, len(new)) == 1.0
+
+
+def test_duplicate_chunks_each_take_their_own_pid():
+    base = hashes_for_full_build(hashes_of(["x", "y", "x"]))
+    delta = plan_delta(base, hashes_of(["x", "x", "x"]))
+    assert delta.reused == {0: 0, 1: 2}
+    assert delta.added == [2]
+    assert delta.removed == [1]
+
+
+def test_min_delta_fraction_is_a_lower_bound():
+    base = hashes_for_full_build(hashes_of(["a", "b", "c", "d"]))
+    new = hashes_of(["a", "b"])
+    delta = plan_delta(base, new)
+    assert min_delta_fraction(4, len(new)) == 1.0
+    assert min_delta_fraction(4, len(new)) <= delta_fraction(delta, len(new))
+
+
+def test_pid_layout_after_update():
+    base_store = ["a", "b", "c", "d"]
+    new_texts = ["a", "B", "c", "e"]
+    new = hashes_of(new_texts)
+    delta = plan_delta(hashes_for_full_build(hashes_of(base_store)), new)
+
+    # process_pdf rewrites the store as the base chunks followed by the added ones
+    store = base_store + [new_texts[position] for position in delta.added]
+    hashes = hashes_after_update(delta, new, first_new_pid=len(base_store))
+
+    assert hashes == {
+        chunk_hash("a"): [0],
+        chunk_hash("c"): [2],
+        chunk_hash("B"): [4],
+        chunk_hash("e"): [5],
+    }
+    # The removed pids stay in the store but are no longer live
+    assert sorted(live_layout(hashes, store)) == [0, 2, 4, 5]
+    assert sorted(live_layout(hashes, store).values()) == sorted(new_texts)
+
+
+def test_second_update_builds_on_the_first():
+    base_store = ["a", "b", "c"]
+    first = hashes_of(["a", "B", "c"])
+    delta = plan_delta(hashes_for_full_build(hashes_of(base_store)), first)
+    store = base_store + ["B"]
+    hashes = hashes_after_update(delta, first, first_new_pid=len(base_store))
+
+    # Pid 1 ("b") is dead: bringing the text back appends it rather than reviving it
+    second_texts = ["a", "b", "c"]
+    second = hashes_of(second_texts)
+    delta = plan_delta(hashes, second)
+    assert delta.reused == {0: 0, 2: 2}
+    assert delta.added == [1]
+    assert delta.removed == [3]
+
+    store = store + [second_texts[position] for position in delta.added]
+    hashes = hashes_after_update(delta, second, first_new_pid=4)
+    assert hashes == {chunk_hash("a"): [0], chunk_hash("c"): [2], chunk_hash("b"): [4]}
+    assert sorted(live_layout(hashes, store).values()) == sorted(second_texts)
+
+
+def test_hashes_round_trip_and_legacy_fallback(tmp_path):
+    store = ["a", "b", "a"]
+    assert load_hashes(str(tmp_path)) is None
+    # Indexes from before hashes were recorded: every store position is live
+    assert load_hashes(str(tmp_path), store) == hashes_for_full_build(hashes_of(store))
+
+    hashes = {chunk_hash("a"): [0, 2]}
+    save_hashes(str(tmp_path), hashes)
+    assert load_hashes(str(tmp_path), store) == hashes
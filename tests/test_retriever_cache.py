@@ -0,0 +1,104 @@
+# tests/test_retriever_cache.py
+#
+# RetrieverCache with a fake loader: a failed load must release the key's
+# lock, and a load overtaken by invalidate() must not be cached.
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from services.retriever_cache import RetrieverCache
+
+
+def fake_retriever(tmp_path):
+    path = tmp_path / "doc_text_chunks.bin"
+    path.write_bytes(b"chunks")
+    return SimpleNamespace(chunk_path=str(path), index_path=str(tmp_path / "no_index"))
+
+
+def run_with_timeout(fn, timeout=5):
+    """Run `fn` on another thread; fail instead of hanging if it blocks."""
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "get() deadlocked"
+    return result
+
+
+def test_failed_load_does_not_block_the_next_get(tmp_path):
+    retriever = fake_retriever(tmp_path)
+    calls = []
+
+    def loader(chunk_filename):
+        calls.append(chunk_filename)
+        if len(calls) == 1:
+            raise RuntimeError("index is corrupt")
+        return retriever
+
+    cache = RetrieverCache(loader=loader)
+    with pytest.raises(RuntimeError):
+        cache.get("doc_text_chunks.bin")
+
+    result = run_with_timeout(lambda: cache.get("doc_text_chunks.bin"))
+    assert result == {"value": retriever}
+    assert len(calls) == 2
+    assert cache.get("doc_text_chunks.bin") is retriever
+    assert len(calls) == 2
+
+
+def test_invalidate_during_load_is_not_cached(tmp_path):
+    stale, fresh = fake_retriever(tmp_path), fake_retriever(tmp_path)
+    loading, release = threading.Event(), threading.Event()
+    results = iter([stale, fresh])
+
+    def loader(chunk_filename):
+        retriever = next(results)
+        if retriever is stale:
+            loading.set()
+            assert release.wait(5)
+        return retriever
+
+    cache = RetrieverCache(loader=loader)
+    first = {}
+    thread = threading.Thread(target=lambda: first.setdefault("value", cache.get("doc_text_chunks.bin")))
+    thread.start()
+    assert loading.wait(5)
+
+    # The document is re-indexed while the old version is still loading
+    cache.invalidate("doc_text_chunks.bin")
+    release.set()
+    thread.join(5)
+
+    assert first["value"] is stale  # the caller that started the load still gets it
+    assert cache.stats()["entries"] == 0
+    assert cache.get("doc_text_chunks.bin") is fresh
+    assert cache.get("doc_text_chunks.bin") is fresh
+
+
+def test_clear_during_load_is_not_cached(tmp_path):
+    stale = fake_retriever(tmp_path)
+    loading, release = threading.Event(), threading.Event()
+
+    def loader(chunk_filename):
+        loading.set()
+        assert release.wait(5)
+        return stale
+
+    cache = RetrieverCache(loader=loader)
+    thread = threading.Thread(target=cache.get, args=("doc_text_chunks.bin",))
+    thread.start()
+    assert loading.wait(5)
+    cache.clear()
+    release.set()
+    thread.join(5)
+
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,79 @@
+# tests/test_sqlite_app.py
+#
+# Starts the whole app against SQLite (see conftest.py): the lifespan must
+# create the schema itself, and the chat endpoints must work on it.
+
+import pytest
+
+for module in ("fastapi", "httpx", "sqlalchemy", "aiosqlite", "jose", "passlib"):
+    pytest.importorskip(module)
+main = pytest.importorskip("main")
+
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def user(client):
+    response = client.post(
+        "/signup", json={"email": "sqlite@example.com", "username": "sqlite", "password": "secret"}
+    )
+    assert response.status_code == 200, response.text
+    response = client.post("/login", data={"username": "sqlite@example.com", "password": "secret"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return {"id": body["id"], "headers": {"Authorization": f"Bearer {body['access_token']}"}}
+
+
+def test_starts_on_a_fresh_database(client):
+    assert client.get("/health/live").json() == {"status": "ok"}
+    assert client.get("/metrics").json()["database"]["backend"] == "sqlite"
+
+
+def test_chat_listing_and_history(client, user):
+    chat_ids = []
+    for i in range(3):
+        response = client.post("/create_chats", json={"user_id": user["id"], "chat_name": f"Chat {i}"})
+        assert response.status_code == 201, response.text
+        chat_ids.append(response.json()["chat_id"])
+    for n in range(5):
+        response = client.post(
+            f"/chats/{chat_ids[0]}/messages", params={"sender": "user", "message": f"message {n}"}
+        )
+        assert response.status_code == 201, response.text
+
+    response = client.get("/chats", params={"limit": 2}, headers=user["headers"])
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert [chat["chat_name"] for chat in page["chats"]] == ["Chat 2", "Chat 1"]
+    assert page["next_cursor"]
+
+    response = client.get("/chats", params={"cursor": page["next_cursor"]}, headers=user["headers"])
+    rest = response.json()
+    assert rest["next_cursor"] is None
+    (first,) = rest["chats"]
+    assert first["id"] == chat_ids[0]
+    assert first["message_count"] == 5
+    assert first["last_message"] == "message 4"
+
+    response = client.get(f"/chats/{chat_ids[0]}/messages", params={"limit": 2})
+    latest = response.json()
+    assert [m["message"] for m in latest["messages"]] == ["message 3", "message 4"]
+    assert latest["has_more"]
+
+    response = client.get(f"/chats/{chat_ids[0]}/messages", params={"limit": 2, "before": latest["next_cursor"]})
+    older = response.json()
+    assert [m["message"] for m in older["messages"]] == ["message 1", "message 2"]
+
+    response = client.get(f"/chats/{chat_ids[0]}/messages", params={"limit": 2, "after": older["newer_cursor"]})
+    assert [m["message"] for m in response.json()["messages"]] == ["message 3", "message 4"]
+
+
+def test_requests_require_a_valid_token(client):
+    response = client.get("/chats", headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 401
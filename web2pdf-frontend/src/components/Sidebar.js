@@ -22,6 +22,8 @@ export default function Sidebar({
   chats,
   setChats,
   setCurrentChat,
+  hasMoreChats,
+  loadMoreChats,
 }) {
   const [isSidebarOpen, setSidebarOpen] = useState(false);
   const [selectedMenuChat, setSelectedMenuChat] = useState(null);
@@ -100,7 +102,21 @@ export default function Sidebar({
         return;
       }
 
-      const { filename } = await res.json();
+      // The upload is processed in the background; poll its job until it settles
+      // (a file that was already processed comes back as done straight away)
+      const { job_id, status } = await res.json();
+      let job = { status };
+      while (job.status !== "done" && job.status !== "failed") {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const jobRes = await fetch(`/jobs/${job_id}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (!jobRes.ok) break;
+        job = await jobRes.json();
+      }
+      if (job.status === "failed") {
+        console.error("PDF processing failed:", job.error);
+      }
       setShowUploadProgress(false);
       navigate("/chatbot");
     } catch (error) {
@@ -133,7 +149,8 @@ export default function Sidebar({
       const newChat = {
         id: data.chat_id,
         chat_name: data.chat_name,
-        messages: [],
+        message_count: 0,
+        last_message: null,
       };
   
       setChats((prev) => [...prev, newChat]);
@@ -225,6 +242,14 @@ export default function Sidebar({
                 )}
               </li>
             ))}
+            {hasMoreChats && (
+              <li
+                className="py-2 px-2 text-sm text-gray-400 hover:text-white cursor-pointer"
+                onClick={loadMoreChats}
+              >
+                Load more…
+              </li>
+            )}
           </ul>
         ) : (
           <p className="text-gray-400">No chats yet!</p>
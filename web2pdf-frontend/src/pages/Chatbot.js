@@ -13,6 +13,8 @@ const Chatbot = () => {
   const [chats, setChats] = useState([]);
   const [currentChat, setCurrentChat] = useState(null);
   const [messages, setMessages] = useState([]);
+  const [chatsCursor, setChatsCursor] = useState(null);
+  const [historyCursor, setHistoryCursor] = useState(null);
 
   const messagesEndRef = useRef(null);
 
@@ -27,17 +29,28 @@ const Chatbot = () => {
     chunk_filename: null,
   });
  
-    // ➊ Load chats once
+    // ➊ Load the first page of chats once
     useEffect(() => {
       async function loadChats() {
         const { data } = await axios.get("/chats", {
           headers: { Authorization: `Bearer ${user.token}` },
         });
-        setChats(data);
+        setChats(data.chats);
+        setChatsCursor(data.next_cursor);
       }
       loadChats();
     }, [user.token]);
 
+  const loadMoreChats = async () => {
+    if (!chatsCursor) return;
+    const { data } = await axios.get("/chats", {
+      params: { cursor: chatsCursor },
+      headers: { Authorization: `Bearer ${user.token}` },
+    });
+    setChats((prev) => [...prev, ...data.chats]);
+    setChatsCursor(data.next_cursor);
+  };
+
     // ➋ Whenever currentChat changes, fetch its messages
   useEffect(() => {
       if (!currentChat) {
@@ -50,10 +63,21 @@ const Chatbot = () => {
           { headers: { Authorization: `Bearer ${user.token}` } }
         );
         setMessages(data.messages);
+        setHistoryCursor(data.next_cursor);
       }
       loadHistory();
     }, [currentChat, user.token]);
 
+  const loadEarlierMessages = async () => {
+    if (!currentChat || !historyCursor) return;
+    const { data } = await axios.get(`/chats/${currentChat.id}/messages`, {
+      params: { before: historyCursor },
+      headers: { Authorization: `Bearer ${user.token}` },
+    });
+    setMessages((prev) => [...data.messages, ...prev]);
+    setHistoryCursor(data.next_cursor);
+  };
+
   // Fetch PDFs each time PDF mode is enabled
   useEffect(() => {
     const fetchUserPdfs = async () => {
@@ -124,7 +148,8 @@ const Chatbot = () => {
         const newChat = {
           id: chatData.chat_id,
           chat_name: chatData.chat_name,
-          messages: [],
+          message_count: 0,
+          last_message: null,
         };
         setChats((prev) => [...prev, newChat]);
         setCurrentChat(newChat);
@@ -153,34 +178,16 @@ const Chatbot = () => {
         },
       });
 
-      // Append messages to the current chat
-      setChats((prev) =>
-        prev.map((chat) =>
-          chat.id === chatId
-            ? {
-                ...chat,
-                messages: [
-                  ...chat.messages,
-                  { sender: "user", message: userInput, timestamp: new Date().toISOString() },
-                  { sender: "bot", message: data.response, timestamp: new Date().toISOString() },
-                ],
-              }
-            : chat
-        )
-      );
-      // Also update currentChat to trigger re-render
-      setCurrentChat((prev) =>
-        prev?.id === chatId
-          ? {
-              ...prev,
-              messages: [
-                ...prev.messages,
-                { sender: "user", message: userInput, timestamp: new Date().toISOString() },
-                { sender: "bot", message: data.response, timestamp: new Date().toISOString() },
-              ],
-            }
-          : prev
-      );
+      // Refresh the chat's preview; listings only carry a summary
+      const summary = (chat) => ({
+        ...chat,
+        message_count: (chat.message_count || 0) + 2,
+        last_message: data.response,
+        last_message_at: new Date().toISOString(),
+      });
+      setChats((prev) => prev.map((chat) => (chat.id === chatId ? summary(chat) : chat)));
+      // Also update currentChat so its history is reloaded
+      setCurrentChat((prev) => (prev?.id === chatId ? summary(prev) : prev));
       setUserInput("");
     } catch (err) {
       console.error("Message send error:", err.response?.data || err.message);
@@ -197,6 +204,8 @@ const Chatbot = () => {
         chats={chats}
         setChats={setChats}
         setCurrentChat={setCurrentChat}
+        hasMoreChats={Boolean(chatsCursor)}
+        loadMoreChats={loadMoreChats}
       />
 
       <div className="flex flex-grow flex-col bg-gray-50">
@@ -247,6 +256,11 @@ const Chatbot = () => {
 
           {/* ➍ Render our new Conversation component */}
           <>
+          {historyCursor && (
+            <button className="self-center text-sm text-blue-600 py-2" onClick={loadEarlierMessages}>
+              Load earlier messages
+            </button>
+          )}
           <Conversation messages={messages} />
           <div ref={messagesEndRef} />
           </>